@@ -0,0 +1,64 @@
+# agregacao.py
+import pandas as pd
+
+# Funções de agregação oferecidas na barra lateral (rótulo -> nome da função no pandas)
+FUNCOES_AGREGACAO = {
+    "Soma": "sum",
+    "Média": "mean",
+    "Contagem": "count",
+    "Mediana": "median",
+}
+
+# Nome da categoria que reúne tudo o que ficou fora do Top N
+ROTULO_OUTROS = "Outros"
+
+# Coluna com a quantidade de linhas originais em cada grupo
+COLUNA_REGISTROS = "Registros"
+
+
+def agregar(df, x, y, cor=None, funcao="sum", top_n=0, rotulo_outros=ROTULO_OUTROS):
+    """
+    Agrupa os dados pelo eixo X (e pela coluna de cor) antes de montar o gráfico,
+    de forma que apenas os pontos agregados sejam enviados ao navegador.
+
+    Parâmetros:
+    - df (DataFrame): Dados linha a linha.
+    - x (str): Coluna do eixo X (chave de agrupamento).
+    - y (str): Coluna agregada. Para durações, use a coluna já convertida para minutos.
+    - cor (str): Coluna de cor, usada como segunda chave de agrupamento. Padrão é None.
+    - funcao (str): 'sum', 'mean', 'count' ou 'median'. Padrão é 'sum'.
+    - top_n (int): Mantém as N categorias de X com maior valor agregado e junta o restante. Padrão é 0 (todas).
+    - rotulo_outros (str): Nome da categoria que reúne o restante. Padrão é 'Outros'.
+
+    Retorno:
+    - DataFrame: Uma linha por grupo, com as colunas de agrupamento, o valor agregado de Y
+      e a quantidade de registros do grupo (se Y for o próprio eixo X, só a quantidade).
+    """
+    if funcao != "count" and not pd.api.types.is_numeric_dtype(df[y]):
+        raise ValueError(f"A coluna '{y}' não é numérica; use 'Contagem' para agrupá-la.")
+
+    chave_x = df[x]
+    if top_n and chave_x.nunique(dropna=False) > top_n:
+        # Classifica as categorias pelo valor agregado e junta as demais em "Outros"
+        ranking = df.groupby(chave_x, sort=False, dropna=False)[y].agg(funcao)
+        principais = ranking.nlargest(top_n).index
+        chave_x = chave_x.astype(object).where(chave_x.isin(principais), rotulo_outros)
+
+    chaves = [chave_x.rename(x)]
+    if cor and cor not in (x, y):
+        chaves.append(df[cor])
+
+    grupos = df.groupby(chaves, sort=False, dropna=False, observed=True)[y]
+    valores = {COLUNA_REGISTROS: grupos.size()}
+    if y != x:
+        # Quando Y é a própria chave do eixo X, o único valor possível é a contagem de registros
+        valores = {y: grupos.agg(funcao), **valores}
+    resultado = pd.DataFrame(valores).reset_index()
+
+    # "Outros" sempre aparece no final do eixo
+    if top_n:
+        resultado = pd.concat([
+            resultado[resultado[x] != rotulo_outros],
+            resultado[resultado[x] == rotulo_outros],
+        ], ignore_index=True)
+    return resultado
@@ -0,0 +1,125 @@
+# gerar_dados.py
+# Gera planilhas sintéticas no formato das exportações de ponto (HH:MM, moeda BR, datas dd/mm/aaaa,
+# nomes com muitas categorias) para medir o aplicativo em volumes de 10 mil a 5 milhões de linhas.
+# Uso: python benchmarks/gerar_dados.py 10000 100000 --formato csv --destino /tmp/graficos_bench
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Linhas por página do XLSX (limite do formato: 1.048.576 linhas, incluindo o cabeçalho)
+MAXIMO_LINHAS_XLSX = 1_048_575
+
+PRIMEIROS_NOMES = [
+    "Ana", "Bruno", "Carla", "Diego", "Eduarda", "Felipe", "Gabriela", "Heitor", "Isabela", "João",
+    "Karina", "Lucas", "Mariana", "Nicolas", "Olívia", "Paulo", "Rafaela", "Sérgio", "Tatiane", "Vítor",
+]
+SOBRENOMES = [
+    "Silva", "Santos", "Oliveira", "Souza", "Rodrigues", "Ferreira", "Alves", "Pereira", "Lima", "Gomes",
+    "Costa", "Ribeiro", "Martins", "Carvalho", "Almeida", "Lopes", "Soares", "Fernandes", "Vieira", "Barbosa",
+]
+DEPARTAMENTOS = [f"Departamento {i:02}" for i in range(1, 41)]
+
+# Proporção de células de horas extras zeradas ("00:00") e em branco
+PROPORCAO_ZERADAS = 0.2
+PROPORCAO_VAZIAS = 0.05
+
+
+def _horas(minutos):
+    # HH:MM a partir de minutos inteiros (horas podem passar de 24)
+    horas = pd.Series(minutos // 60).astype(str)
+    return horas + ":" + pd.Series(minutos % 60).astype(str).str.zfill(2)
+
+
+def _moeda(valores):
+    # R$ 1.234,56: separa reais e centavos e agrupa os milhares com ponto
+    centavos = np.round(valores * 100).astype("int64")
+    reais = pd.Series(centavos // 100).map("{:,}".format).str.replace(",", ".", regex=False)
+    return "R$ " + reais + "," + pd.Series(centavos % 100).astype(str).str.zfill(2)
+
+
+def gerar_dataframe(linhas, semente=0):
+    """
+    Monta os dados sintéticos, com todas as células em texto (como chegam nas exportações).
+
+    Parâmetros:
+    - linhas (int): Quantidade de linhas.
+    - semente (int): Semente do gerador aleatório (os mesmos parâmetros geram os mesmos dados). Padrão é 0.
+
+    Retorno:
+    - DataFrame: Colunas Nome, Matrícula, Departamento, Data, Horas Normais, Horas Extras, Salário e Faltas.
+    """
+    rng = np.random.default_rng(semente)
+    # Nomes com cardinalidade alta: cerca de uma pessoa para cada 20 linhas
+    pessoas = max(linhas // 20, 1)
+    pessoa = rng.integers(0, pessoas, linhas)
+    nomes = (
+        pd.Series(np.array(PRIMEIROS_NOMES)[pessoa % len(PRIMEIROS_NOMES)])
+        + " " + pd.Series(np.array(SOBRENOMES)[(pessoa // len(PRIMEIROS_NOMES)) % len(SOBRENOMES)])
+        + " " + pd.Series(pessoa).astype(str)
+    )
+
+    extras = _horas(rng.integers(1, 40 * 60, linhas))
+    sorteio = rng.random(linhas)
+    extras[sorteio < PROPORCAO_ZERADAS] = "00:00"
+    extras[sorteio < PROPORCAO_VAZIAS] = ""
+
+    datas = pd.Timestamp("2023-01-01") + pd.to_timedelta(rng.integers(0, 730, linhas), unit="D")
+    return pd.DataFrame({
+        "Nome": nomes,
+        "Matrícula": pd.Series(pessoa + 100_000).astype(str),
+        "Departamento": np.array(DEPARTAMENTOS)[pessoa % len(DEPARTAMENTOS)],
+        "Data": datas.strftime("%d/%m/%Y"),
+        "Horas Normais": _horas(rng.integers(100 * 60, 220 * 60, linhas)),
+        "Horas Extras": extras,
+        "Salário": _moeda(rng.uniform(1_500, 25_000, linhas)),
+        "Faltas": rng.poisson(1.0, linhas).astype(str),
+    })
+
+
+def gravar_arquivo(linhas, formato="csv", destino=".", semente=0):
+    """
+    Gera o arquivo sintético, reaproveitando-o se já existir com os mesmos parâmetros.
+
+    Parâmetros:
+    - linhas (int): Quantidade de linhas.
+    - formato (str): 'csv' ou 'xlsx'. Padrão é 'csv'.
+    - destino (str | Path): Diretório dos arquivos. Padrão é o diretório atual.
+    - semente (int): Semente do gerador aleatório. Padrão é 0.
+
+    Retorno:
+    - Path: Caminho do arquivo.
+    """
+    if formato == "xlsx" and linhas > MAXIMO_LINHAS_XLSX:
+        raise ValueError(f"O XLSX comporta no máximo {MAXIMO_LINHAS_XLSX} linhas de dados.")
+    caminho = Path(destino) / f"ponto_{linhas}_{semente}.{formato}"
+    if caminho.exists():
+        return caminho
+
+    caminho.parent.mkdir(parents=True, exist_ok=True)
+    temporario = caminho.with_suffix(f".tmp.{formato}")
+    df = gerar_dataframe(linhas, semente)
+    if formato == "csv":
+        df.to_csv(temporario, index=False)
+    elif formato == "xlsx":
+        df.to_excel(temporario, index=False, engine="openpyxl")
+    else:
+        raise ValueError(f"Formato desconhecido: {formato}")
+    temporario.replace(caminho)
+    return caminho
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gera planilhas de ponto sintéticas para os benchmarks.")
+    parser.add_argument("linhas", type=int, nargs="+", help="Quantidades de linhas (um arquivo por quantidade)")
+    parser.add_argument("--formato", choices=["csv", "xlsx"], default="csv")
+    parser.add_argument("--destino", default=".", help="Diretório dos arquivos (padrão: atual)")
+    parser.add_argument("--semente", type=int, default=0)
+    args = parser.parse_args(argv)
+    for linhas in args.linhas:
+        print(gravar_arquivo(linhas, args.formato, args.destino, args.semente))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+# medir.py
+# Mede cada etapa do aplicativo com planilhas sintéticas de tamanhos crescentes, grava os resultados
+# em JSON e compara com uma medição de referência (base), apontando as etapas que ficaram mais lentas.
+# Uso: python benchmarks/medir.py --tamanhos 10000 100000 --formatos csv
+#      (resultados em benchmarks/resultados/resultados_benchmark.json; mude com --saida)
+#      python benchmarks/medir.py --rapido --salvar-base   (grava benchmarks/base.json)
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+
+import ingestao  # noqa: E402
+from agregacao import agregar  # noqa: E402
+from eixos import estatisticas_eixo, gerar_ticks  # noqa: E402
+from figura import construir_figura, montar_texto_barras  # noqa: E402
+from filtros import linhas_filtradas  # noqa: E402
+from ordenacao import ordenar_linhas  # noqa: E402
+from pipeline import adicionar_minutos, materializar  # noqa: E402
+from transporte import relatorio_transporte  # noqa: E402
+
+from gerar_dados import MAXIMO_LINHAS_XLSX, gravar_arquivo  # noqa: E402
+
+TAMANHOS = [10_000, 100_000, 1_000_000, 5_000_000]
+TAMANHOS_RAPIDOS = [10_000, 100_000]
+
+# Acima deste número de linhas a figura com uma barra por linha não é montada (o aplicativo
+# também não daria conta); a figura agregada é medida em todos os tamanhos
+LIMITE_FIGURA = 1_000_000
+
+# Acima deste número de linhas o aplicativo completo (AppTest) não é executado
+LIMITE_APPTEST = 100_000
+
+# Quanto uma etapa pode ficar mais lenta que a base antes de ser apontada (1.25 = 25%)
+TOLERANCIA = 1.25
+
+# Etapas abaixo deste tempo (segundos) não são comparadas: o ruído domina
+TEMPO_MINIMO_COMPARACAO = 0.01
+
+CAMINHO_BASE = Path(__file__).resolve().parent / "base.json"
+# Resultados de cada execução (fora do controle de versão, ver .gitignore)
+CAMINHO_SAIDA = Path(__file__).resolve().parent / "resultados" / "resultados_benchmark.json"
+
+
+@contextmanager
+def cronometro(tempos, etapa):
+    inicio = time.perf_counter()
+    yield
+    tempos[etapa] = time.perf_counter() - inicio
+
+
+def medir_etapas(caminho):
+    """
+    Executa uma vez a sequência do aplicativo sobre o arquivo, com o cache de ingestão vazio,
+    cronometrando cada etapa.
+
+    Parâmetros:
+    - caminho (Path): Planilha sintética.
+
+    Retorno:
+    - tempos (dict): Segundos por etapa.
+    - medidas (dict): Tamanhos medidos (bytes do JSON da figura, linhas após o filtro, ...).
+    """
+    tempos, medidas = {}, {}
+    dados = caminho.read_bytes()
+
+    # Cada execução usa um diretório de cache novo: a ingestão é sempre medida a frio
+    ingestao.DIRETORIO_CACHE = Path(tempfile.mkdtemp(prefix="graficos_bench_"))
+    try:
+        with cronometro(tempos, "ingerir"):
+            chave = ingestao.ingerir_arquivo(caminho.name, dados)
+        with cronometro(tempos, "inferir_esquema"):
+            ingestao.obter_esquema(chave)
+        with cronometro(tempos, "converter_tipos"):
+            df, esquema = ingestao.fatiar_tabela(chave)
+        tempos["load_data"] = tempos["ingerir"] + tempos["inferir_esquema"] + tempos["converter_tipos"]
+
+        with cronometro(tempos, "filtro_nulos"):
+            selecionadas = linhas_filtradas(df, [{"coluna": "Horas Extras", "regra": "preenchidos"}], esquema)
+        with cronometro(tempos, "ordenar"):
+            ordem = ordenar_linhas(df, selecionadas, "Nome", tipo=esquema.get("Nome"))
+        with cronometro(tempos, "materializar"):
+            df = materializar((df, ordem))
+        medidas["linhas_filtradas"] = len(df)
+
+        with cronometro(tempos, "minutos"):
+            df, _ = adicionar_minutos(df, "Horas Extras", nome="Horas Extras Minutos")
+        with cronometro(tempos, "ticks"):
+            tick_vals, tick_texts = gerar_ticks(estatisticas_eixo(df, "Horas Extras Minutos", "duracao"), passo_minimo=5)
+        with cronometro(tempos, "texto_barras"):
+            montar_texto_barras(df, ["Nome", "Departamento"])
+
+        spec = {
+            "x": "Nome", "y": "Horas Extras Minutos", "cor": "Departamento", "texto": None,
+            "hover": ["Matrícula", "Salário"], "tick_vals": tick_vals, "tick_texts": tick_texts, "tipo": "barras",
+        }
+        if len(df) <= LIMITE_FIGURA:
+            with cronometro(tempos, "figura"):
+                fig = construir_figura(df, spec)
+            transporte = relatorio_transporte(fig)
+            tempos["figura_json"] = transporte["json_ms"] / 1000
+            tempos["figura_binaria"] = transporte["binario_ms"] / 1000
+            medidas["figura_json_bytes"] = transporte["json_bytes"]
+            medidas["figura_binaria_bytes"] = transporte["binario_bytes"]
+
+        with cronometro(tempos, "agregar"):
+            agregado = agregar(df, "Departamento", "Horas Extras Minutos", cor="Departamento", funcao="sum")
+        with cronometro(tempos, "figura_agregada"):
+            fig = construir_figura(agregado, {**spec, "x": "Departamento", "hover": []})
+        medidas["figura_agregada_json_bytes"] = relatorio_transporte(fig)["json_bytes"]
+    finally:
+        shutil.rmtree(ingestao.DIRETORIO_CACHE, ignore_errors=True)
+    return tempos, medidas
+
+
+def medir_aplicativo(caminho):
+    """
+    Executa o aplicativo completo sem navegador (AppTest): o upload do arquivo (até o gráfico aparecer)
+    e um rerun sem mudanças.
+
+    Retorno:
+    - dict: Segundos da primeira execução ('app_upload') e do rerun ('app_rerun').
+    """
+    from streamlit.testing.v1 import AppTest
+
+    tempos = {}
+    app = AppTest.from_file(str(RAIZ / "graficos.py"), default_timeout=600)
+    app.run()
+    app.file_uploader[0].set_value((caminho.name, caminho.read_bytes(), "text/csv"))
+    with cronometro(tempos, "app_upload"):
+        app.run()
+        # Arquivos grandes são carregados em segundo plano: espera a carga e refaz a página, como o navegador
+        tarefa = app.session_state["tarefa_carga"] if "tarefa_carga" in app.session_state else None
+        if tarefa is not None and not tarefa.concluida:
+            tarefa.aguardar(None)
+            app.run()
+    with cronometro(tempos, "app_rerun"):
+        app.run()
+    erros = [erro.value for erro in app.error] + [excecao.message for excecao in app.exception]
+    if erros:
+        raise RuntimeError(f"O aplicativo falhou: {erros[0]}")
+    return tempos
+
+
+def medir(tamanhos, formatos, destino, repeticoes=3, apptest=True):
+    """
+    Mede todas as combinações de tamanho e formato; cada etapa guarda a mediana das repetições.
+
+    Retorno:
+    - dict: {'ambiente': {...}, 'resultados': [{'formato', 'linhas', 'tempos', 'medidas'}, ...]}.
+    """
+    resultados = []
+    for formato in formatos:
+        for linhas in tamanhos:
+            if formato == "xlsx" and linhas > MAXIMO_LINHAS_XLSX:
+                print(f"{formato} {linhas}: acima do limite do XLSX, pulado", file=sys.stderr)
+                continue
+            caminho = gravar_arquivo(linhas, formato, destino)
+            execucoes = [medir_etapas(caminho) for _ in range(repeticoes)]
+            tempos = {
+                etapa: round(statistics.median(tempos[etapa] for tempos, _ in execucoes), 4)
+                for etapa in execucoes[0][0]
+            }
+            if apptest and formato == "csv" and linhas <= LIMITE_APPTEST:
+                tempos.update({etapa: round(segundos, 4) for etapa, segundos in medir_aplicativo(caminho).items()})
+            resultados.append({
+                "formato": formato,
+                "linhas": linhas,
+                "arquivo_bytes": caminho.stat().st_size,
+                "tempos": tempos,
+                "medidas": execucoes[0][1],
+            })
+            print(f"{formato} {linhas}: {json.dumps(tempos)}", file=sys.stderr)
+    return {
+        "ambiente": {
+            "python": platform.python_version(),
+            "plataforma": platform.platform(),
+            "cpus": os.cpu_count(),
+            "data": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "resultados": resultados,
+    }
+
+
+def comparar(atual, base, tolerancia=TOLERANCIA):
+    """
+    Compara cada etapa com a mesma etapa (formato e tamanho) da base.
+
+    Retorno:
+    - list: Regressões, como {'formato', 'linhas', 'etapa', 'base', 'atual', 'razao'}.
+    """
+    referencias = {(item["formato"], item["linhas"]): item["tempos"] for item in base["resultados"]}
+    regressoes = []
+    for item in atual["resultados"]:
+        tempos_base = referencias.get((item["formato"], item["linhas"]), {})
+        for etapa, segundos in item["tempos"].items():
+            anterior = tempos_base.get(etapa)
+            if anterior is None or max(anterior, segundos) < TEMPO_MINIMO_COMPARACAO:
+                continue
+            razao = segundos / max(anterior, 1e-9)
+            if razao > tolerancia:
+                regressoes.append({
+                    "formato": item["formato"], "linhas": item["linhas"], "etapa": etapa,
+                    "base": anterior, "atual": segundos, "razao": round(razao, 2),
+                })
+    return regressoes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark das etapas do aplicativo com planilhas sintéticas.")
+    parser.add_argument("--tamanhos", type=int, nargs="+", default=None, help=f"Linhas por arquivo (padrão: {TAMANHOS})")
+    parser.add_argument("--rapido", action="store_true", help=f"Usa só {TAMANHOS_RAPIDOS} linhas")
+    parser.add_argument("--formatos", nargs="+", choices=["csv", "xlsx"], default=["csv"])
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--sem-apptest", action="store_true", help="Não executa o aplicativo completo")
+    parser.add_argument("--dados", default=str(Path(tempfile.gettempdir()) / "graficos_bench"), help="Diretório das planilhas geradas")
+    parser.add_argument("--saida", default=str(CAMINHO_SAIDA), help="Arquivo JSON dos resultados")
+    parser.add_argument("--base", default=str(CAMINHO_BASE), help="Medição de referência para a comparação")
+    parser.add_argument("--salvar-base", action="store_true", help="Grava os resultados também como a nova base")
+    parser.add_argument("--tolerancia", type=float, default=TOLERANCIA)
+    args = parser.parse_args(argv)
+
+    tamanhos = args.tamanhos or (TAMANHOS_RAPIDOS if args.rapido else TAMANHOS)
+    resultado = medir(tamanhos, args.formatos, args.dados, args.repeticoes, apptest=not args.sem_apptest)
+
+    base = Path(args.base)
+    if base.exists() and not args.salvar_base:
+        resultado["regressoes"] = comparar(resultado, json.loads(base.read_text(encoding="utf-8")), args.tolerancia)
+        for regressao in resultado["regressoes"]:
+            print(
+                f"REGRESSÃO {regressao['formato']} {regressao['linhas']} {regressao['etapa']}: "
+                f"{regressao['base']:.3f} s → {regressao['atual']:.3f} s ({regressao['razao']}×)",
+                file=sys.stderr,
+            )
+
+    texto = json.dumps(resultado, ensure_ascii=False, indent=2)
+    saida = Path(args.saida)
+    saida.parent.mkdir(parents=True, exist_ok=True)
+    saida.write_text(texto, encoding="utf-8")
+    if args.salvar_base:
+        base.write_text(texto, encoding="utf-8")
+    return 1 if resultado.get("regressoes") else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,301 @@
+# cache.py
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+# Orçamento de memória (MB) compartilhado por todas as sessões do processo
+LIMITE_MEMORIA_MB = int(os.environ.get("GRAFICOS_CACHE_MB", 1024))
+
+# Tempo de vida (segundos) de uma entrada sem ser recalculada; 0 = sem expiração
+TTL_SEGUNDOS = int(os.environ.get("GRAFICOS_CACHE_TTL", 6 * 3600))
+
+# Espaço em disco (MB) para as fatias despejadas da memória, compartilhado entre processos; 0 = desligado
+LIMITE_DISCO_MB = int(os.environ.get("GRAFICOS_CACHE_DISCO_MB", 0))
+
+# Diretório das fatias gravadas em disco
+DIRETORIO_DISCO = Path(os.environ.get("GRAFICOS_CACHE_DIR", Path(tempfile.gettempdir()) / "graficos_cache")) / "fatias"
+
+# Valores de texto amostrados para estimar o tamanho de colunas de objetos
+AMOSTRA_TEXTO = 1000
+
+_AUSENTE = object()
+
+
+def _bytes_objetos(valores):
+    # Estima o tamanho de um array de objetos a partir de uma amostra (medir tudo custaria uma passada em Python)
+    if len(valores) == 0:
+        return 0
+    amostra = valores[np.linspace(0, len(valores) - 1, min(len(valores), AMOSTRA_TEXTO)).astype("int64")]
+    media = sum(sys.getsizeof(valor) for valor in amostra) / len(amostra)
+    return int(valores.nbytes + media * len(valores))
+
+
+def estimar_bytes(valor, excluir=()):
+    """
+    Estima a memória ocupada por um valor guardado no cache (DataFrames, Series, arrays, figuras e
+    coleções desses objetos). Objetos em `excluir` não são contados: pertencem a outra entrada.
+
+    Parâmetros:
+    - valor: Valor a medir.
+    - excluir (tuple): Objetos já contados em outro lugar (comparados por identidade). Padrão é ().
+
+    Retorno:
+    - int: Bytes estimados.
+    """
+    if any(valor is objeto for objeto in excluir):
+        return 0
+    if isinstance(valor, pd.DataFrame):
+        return sum(estimar_bytes(valor.iloc[:, i]) for i in range(valor.shape[1])) + int(valor.index.memory_usage())
+    if isinstance(valor, pd.Series):
+        if valor.dtype == object:
+            return _bytes_objetos(valor.to_numpy())
+        return int(valor.memory_usage(index=False))
+    if isinstance(valor, np.ndarray):
+        return _bytes_objetos(valor) if valor.dtype == object else int(valor.nbytes)
+    if isinstance(valor, (tuple, list)):
+        return sys.getsizeof(valor) + sum(estimar_bytes(item, excluir) for item in valor)
+    if isinstance(valor, dict):
+        return sys.getsizeof(valor) + sum(estimar_bytes(item, excluir) for item in valor.values())
+    if hasattr(valor, "data") and hasattr(valor, "layout"):
+        # Figura do Plotly: os arrays de cada trace dominam o tamanho
+        return sum(estimar_bytes(trace.to_plotly_json()) for trace in valor.data)
+    return sys.getsizeof(valor)
+
+
+def _persistivel(valor):
+    return isinstance(valor, pd.DataFrame) or (
+        isinstance(valor, tuple) and len(valor) == 2 and isinstance(valor[0], pd.DataFrame) and isinstance(valor[1], dict)
+    )
+
+
+def limpar_diretorio(diretorio, limite_bytes, ttl=0, padroes=("*",)):
+    """
+    Apaga os arquivos mais antigos (pela data de modificação) até o diretório caber no limite,
+    além dos que passaram do tempo de vida. Arquivos temporários em gravação não são tocados.
+
+    Parâmetros:
+    - diretorio (Path): Diretório a limpar (não recursivo).
+    - limite_bytes (int): Tamanho máximo do conteúdo.
+    - ttl (int): Idade máxima dos arquivos, em segundos (0 = sem limite). Padrão é 0.
+    - padroes (tuple): Padrões (glob) dos arquivos considerados. Padrão é todos.
+
+    Retorno:
+    - int: Quantidade de arquivos apagados.
+    """
+    arquivos = []
+    for padrao in padroes:
+        for caminho in Path(diretorio).glob(padrao):
+            if caminho.is_file() and not caminho.name.endswith(".tmp"):
+                try:
+                    estado = caminho.stat()
+                except FileNotFoundError:
+                    continue  # Apagado por outro processo
+                arquivos.append((estado.st_mtime, estado.st_size, caminho))
+    arquivos.sort()
+
+    agora, total, apagados = time.time(), sum(tamanho for _, tamanho, _ in arquivos), 0
+    for modificado, tamanho, caminho in arquivos:
+        if total <= limite_bytes and not (ttl and agora - modificado > ttl):
+            continue
+        try:
+            caminho.unlink()
+            apagados += 1
+        except FileNotFoundError:
+            pass
+        total -= tamanho
+    return apagados
+
+
+class CacheLimitado:
+    """
+    Cache LRU compartilhado entre as sessões do processo, limitado por bytes estimados e com tempo de vida.
+    Com um limite de disco, DataFrames despejados da memória (ou guardados com persistir=True) são gravados
+    em Arrow, endereçados pela chave, e podem ser lidos de volta por este ou por outro processo.
+    """
+
+    def __init__(self, limite_bytes, ttl=0, diretorio=None, limite_disco_bytes=0):
+        self.limite_bytes = limite_bytes
+        self.ttl = ttl
+        self.diretorio = Path(diretorio) if diretorio and limite_disco_bytes else None
+        self.limite_disco_bytes = limite_disco_bytes
+        self._entradas = OrderedDict()  # chave -> (valor, bytes, criado em)
+        self._bytes = 0
+        self._trava = threading.Lock()
+        self._contadores = dict.fromkeys(
+            ["acertos", "faltas", "despejos", "expirados", "acertos_disco", "gravados_disco"], 0
+        )
+
+    def _expirado(self, criado):
+        return bool(self.ttl) and time.monotonic() - criado > self.ttl
+
+    def contem(self, chave):
+        """
+        Indica se a chave está na memória e válida (não altera os contadores nem a ordem de uso).
+        """
+        with self._trava:
+            entrada = self._entradas.get(chave)
+            return entrada is not None and not self._expirado(entrada[2])
+
+    def obter(self, chave, padrao=None):
+        """
+        Retorna o valor guardado (da memória ou, se houver, do disco) ou `padrao`, contando acerto ou falta.
+        """
+        with self._trava:
+            entrada = self._entradas.get(chave)
+            if entrada is not None and self._expirado(entrada[2]):
+                self._remover(chave)
+                self._contadores["expirados"] += 1
+                entrada = None
+            if entrada is not None:
+                self._entradas.move_to_end(chave)
+                self._contadores["acertos"] += 1
+                return entrada[0]
+
+        valor = self._ler_disco(chave)
+        with self._trava:
+            if valor is _AUSENTE:
+                self._contadores["faltas"] += 1
+                return padrao
+            self._contadores["acertos_disco"] += 1
+        self.guardar(chave, valor)
+        return valor
+
+    def guardar(self, chave, valor, tamanho=None, persistir=False):
+        """
+        Guarda o valor e despeja as entradas usadas há mais tempo até caber no orçamento.
+
+        Parâmetros:
+        - chave: Chave (hashable; serializável em JSON para ir ao disco).
+        - valor: Valor guardado (compartilhado; tratado como somente leitura).
+        - tamanho (int): Bytes do valor, se já conhecidos. Padrão é None (estimados).
+        - persistir (bool): Grava também no disco agora (DataFrames ou (DataFrame, dict)). Padrão é False.
+        """
+        tamanho = estimar_bytes(valor) if tamanho is None else tamanho
+        if persistir:
+            self._gravar_disco(chave, valor)
+
+        despejados = []
+        with self._trava:
+            if chave in self._entradas:
+                self._remover(chave)
+            if tamanho <= self.limite_bytes:
+                self._entradas[chave] = (valor, tamanho, time.monotonic())
+                self._bytes += tamanho
+            else:
+                # Sozinho já passaria do orçamento: vai direto para o disco (se houver)
+                self._contadores["despejos"] += 1
+                despejados.append((chave, valor))
+            while self._bytes > self.limite_bytes and self._entradas:
+                antiga, (valor_antigo, _, _) = next(iter(self._entradas.items()))
+                self._remover(antiga)
+                self._contadores["despejos"] += 1
+                despejados.append((antiga, valor_antigo))
+
+        # A gravação em disco acontece fora da trava (pode levar alguns segundos)
+        for antiga, valor_antigo in despejados:
+            self._gravar_disco(antiga, valor_antigo)
+
+    def obter_ou_calcular(self, chave, calcular, persistir=False, excluir=()):
+        """
+        Retorna o valor guardado ou o calcula com calcular() e o guarda (veja guardar).
+        Objetos em `excluir` (ex.: a entrada de uma etapa, que já está no cache) não entram no tamanho.
+        """
+        valor = self.obter(chave, _AUSENTE)
+        if valor is _AUSENTE:
+            valor = calcular()
+            self.guardar(chave, valor, tamanho=estimar_bytes(valor, excluir), persistir=persistir)
+        return valor
+
+    def _remover(self, chave):
+        _, tamanho, _ = self._entradas.pop(chave)
+        self._bytes -= tamanho
+
+    def _caminho(self, chave):
+        texto = json.dumps(chave, sort_keys=True, default=str)
+        return self.diretorio / f"{hashlib.blake2b(texto.encode(), digest_size=16).hexdigest()}.arrow"
+
+    def _gravar_disco(self, chave, valor):
+        if self.diretorio is None or not _persistivel(valor):
+            return
+        caminho = self._caminho(chave)
+        if caminho.exists():
+            os.utime(caminho)  # Conta como uso recente na limpeza do diretório
+            return
+        df, extra = (valor, None) if isinstance(valor, pd.DataFrame) else valor
+        tabela = pa.Table.from_pandas(df, preserve_index=True)
+        metadados = {**(tabela.schema.metadata or {}), b"graficos_extra": json.dumps(extra, default=str).encode()}
+        tabela = tabela.replace_schema_metadata(metadados)
+
+        self.diretorio.mkdir(parents=True, exist_ok=True)
+        temporario = caminho.with_name(f"{caminho.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            with pa.OSFile(str(temporario), "wb") as destino, pa.ipc.new_file(destino, tabela.schema) as escritor:
+                escritor.write_table(tabela)
+            os.replace(temporario, caminho)
+        finally:
+            if temporario.exists():
+                temporario.unlink()
+        with self._trava:
+            self._contadores["gravados_disco"] += 1
+        limpar_diretorio(self.diretorio, self.limite_disco_bytes, self.ttl, padroes=("*.arrow",))
+
+    def _ler_disco(self, chave):
+        if self.diretorio is None:
+            return _AUSENTE
+        caminho = self._caminho(chave)
+        try:
+            if self._expirado_disco(caminho):
+                return _AUSENTE
+            tabela = pa.ipc.open_file(pa.memory_map(str(caminho), "r")).read_all()
+        except (FileNotFoundError, pa.ArrowInvalid):
+            return _AUSENTE
+        os.utime(caminho)
+        extra = json.loads(tabela.schema.metadata.get(b"graficos_extra", b"null"))
+        df = tabela.to_pandas()
+        return df if extra is None else (df, extra)
+
+    def _expirado_disco(self, caminho):
+        return bool(self.ttl) and time.time() - caminho.stat().st_mtime > self.ttl
+
+    def estatisticas(self):
+        """
+        Retorna os contadores (acertos, faltas, despejos, expirados, acertos_disco, gravados_disco),
+        a taxa de acerto e a ocupação da memória.
+        """
+        with self._trava:
+            contadores = dict(self._contadores)
+            consultas = contadores["acertos"] + contadores["acertos_disco"] + contadores["faltas"]
+            return {
+                **contadores,
+                "taxa_acerto": (contadores["acertos"] + contadores["acertos_disco"]) / consultas if consultas else None,
+                "entradas": len(self._entradas),
+                "bytes": self._bytes,
+                "limite_bytes": self.limite_bytes,
+            }
+
+    def limpar(self):
+        """
+        Esvazia a memória (o disco e os contadores são mantidos).
+        """
+        with self._trava:
+            self._entradas.clear()
+            self._bytes = 0
+
+
+# Cache único do processo: fatias carregadas, etapas do pipeline, permutações e figuras disputam o mesmo orçamento
+CACHE = CacheLimitado(
+    LIMITE_MEMORIA_MB * 1024 ** 2,
+    ttl=TTL_SEGUNDOS,
+    diretorio=DIRETORIO_DISCO,
+    limite_disco_bytes=LIMITE_DISCO_MB * 1024 ** 2,
+)
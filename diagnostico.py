@@ -0,0 +1,144 @@
+# diagnostico.py
+import json
+import logging
+import os
+import sys
+import time
+import uuid
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+import plotly.io as pio
+
+try:
+    import resource  # Indisponível no Windows: sem a medida de memória
+except ImportError:
+    resource = None
+
+from cache import CACHE
+from pipeline import etapa_em_cache, executar_etapa, impressao_etapa
+
+# Liga a medição em todas as sessões, sem depender da opção na barra lateral
+SEMPRE_ATIVO = os.environ.get("GRAFICOS_DIAGNOSTICO", "") == "1"
+
+# Arquivo opcional para as linhas de log em JSON (padrão: saída de erro do processo)
+ARQUIVO_LOG = os.environ.get("GRAFICOS_DIAGNOSTICO_LOG")
+
+# Uma linha JSON por etapa medida, para o coletor de logs
+logger = logging.getLogger("graficos.diagnostico")
+if not logger.handlers:
+    _saida = logging.FileHandler(ARQUIVO_LOG, encoding="utf-8") if ARQUIVO_LOG else logging.StreamHandler(sys.stderr)
+    _saida.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_saida)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+
+def pico_memoria_mb():
+    """
+    Retorna o pico de memória residente (RSS) do processo até agora, em MB, ou None se não houver a medida.
+    """
+    if resource is None:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # O Linux informa em KB e o macOS em bytes
+    return pico / 1024 ** 2 if sys.platform == "darwin" else pico / 1024
+
+
+def dimensoes(resultado):
+    """
+    Retorna linhas e colunas do resultado de uma etapa: um DataFrame, uma seleção (df, linhas)
+    ou um par (df, informações extras).
+    """
+    if isinstance(resultado, tuple) and len(resultado) == 2 and isinstance(resultado[0], pd.DataFrame):
+        df, extra = resultado
+        linhas = len(extra) if isinstance(extra, np.ndarray) else len(df)
+        return {"linhas": linhas, "colunas": df.shape[1]}
+    if isinstance(resultado, pd.DataFrame):
+        return {"linhas": resultado.shape[0], "colunas": resultado.shape[1]}
+    return {}
+
+
+class Medidor:
+    """
+    Mede as etapas de uma execução do script (tempo, pico de memória, tamanho dos dados e uso do cache).
+    Desligado, não mede nada e só repassa as chamadas.
+    """
+
+    def __init__(self, ativo=False, sessao=None):
+        self.ativo = ativo or SEMPRE_ATIVO
+        self.sessao = sessao
+        self.execucao = uuid.uuid4().hex[:8]
+        self.registros = []
+        self.total = None
+        self._inicio = time.perf_counter()
+        self._pico_inicial = pico_memoria_mb()
+
+    @contextmanager
+    def etapa(self, nome, cache=None):
+        """
+        Mede o bloco como uma etapa. O dicionário devolvido aceita medidas extras (ex.: 'linhas', 'bytes').
+
+        Parâmetros:
+        - nome (str): Nome da etapa.
+        - cache (str): 'acerto' ou 'falta', se a etapa tiver cache. Padrão é None.
+        """
+        registro = {"etapa": nome, "cache": cache}
+        if not self.ativo:
+            yield registro
+            return
+        pico, inicio = pico_memoria_mb(), time.perf_counter()
+        try:
+            yield registro
+        finally:
+            registro["segundos"] = round(time.perf_counter() - inicio, 4)
+            if pico is not None:
+                registro["pico_rss_delta_mb"] = round(pico_memoria_mb() - pico, 1)
+            self.registros.append(registro)
+            self._log({"evento": "etapa", **registro})
+
+    def executar_etapa(self, nome, funcao, entrada, impressao, /, **parametros):
+        """
+        Executa uma etapa do pipeline (veja pipeline.executar_etapa), medindo-a quando ativo.
+        """
+        if not self.ativo:
+            return executar_etapa(nome, funcao, entrada, impressao, **parametros)
+        guardada = etapa_em_cache(impressao_etapa(impressao, nome, parametros))
+        with self.etapa(nome, cache="acerto" if guardada else "falta") as registro:
+            resultado, chave = executar_etapa(nome, funcao, entrada, impressao, **parametros)
+            registro.update(dimensoes(resultado))
+        return resultado, chave
+
+    def incorporar(self, outro):
+        """
+        Acrescenta a esta execução as etapas medidas por outro medidor (ex.: o da carga em segundo plano,
+        que já as registrou no log).
+        """
+        if self.ativo:
+            self.registros.extend(outro.registros)
+
+    def finalizar(self):
+        """
+        Registra o total da execução e retorna as etapas medidas como tabela (vazia se desligado).
+        """
+        if not self.ativo:
+            return pd.DataFrame()
+        total = {"evento": "execucao", "segundos": round(time.perf_counter() - self._inicio, 4), "etapas": len(self.registros)}
+        if self._pico_inicial is not None:
+            total["pico_rss_mb"] = round(pico_memoria_mb(), 1)
+            total["pico_rss_delta_mb"] = round(pico_memoria_mb() - self._pico_inicial, 1)
+        total["cache"] = CACHE.estatisticas()
+        self._log(total)
+        self.total = total
+        return pd.DataFrame(self.registros)
+
+    def _log(self, dados):
+        logger.info(json.dumps({"sessao": self.sessao, "execucao": self.execucao, **dados}, ensure_ascii=False, default=str))
+
+
+def bytes_figura(fig):
+    """
+    Retorna o tamanho, em bytes, do JSON que a figura envia ao navegador (já no formato binário, se for o caso).
+    """
+    return len(pio.to_json(fig.to_dict(), validate=False))
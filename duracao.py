@@ -0,0 +1,59 @@
+# duracao.py
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+# Expressão regular para durações: sinal opcional, horas sem limite (ex.: 125:00),
+# minutos e segundos opcionais (HH:MM ou HH:MM:SS)
+PADRAO_DURACAO = (
+    r"^\s*(?P<sinal>[-+]?)\s*(?P<horas>\d+):(?P<minutos>[0-5]?\d)"
+    r"(?::(?P<segundos>[0-5]?\d))?\s*$"
+)
+
+
+def _como_texto_arrow(serie):
+    """
+    Converte uma Series qualquer em um array de texto do Arrow, sem laço em Python.
+    """
+    return pa.array(serie.astype("string[pyarrow]"))
+
+
+def converter_duracao_para_minutos(serie, amostra_erros=5):
+    """
+    Converte uma coluna inteira de durações (HH:MM ou HH:MM:SS) para minutos, de forma vetorizada.
+
+    Parâmetros:
+    - serie (Series): Coluna com as durações em texto. Aceita valores negativos e horas acima de 24.
+    - amostra_erros (int): Quantidade máxima de índices de linhas inválidas guardados no relatório.
+
+    Retorno:
+    - minutos (Series): Duração em minutos (float; segundos viram fração). Vazios e inválidos ficam NaN.
+    - erros (dict): {"total": quantidade de células mal formatadas, "amostra": índices de exemplo}.
+    """
+    texto = _como_texto_arrow(serie)
+    partes = pc.extract_regex(texto, PADRAO_DURACAO)
+
+    # Linhas vazias (nulas ou só espaços) não são consideradas erro
+    vazios = pc.fill_null(pc.equal(pc.utf8_trim_whitespace(texto), ""), True).to_numpy(zero_copy_only=False)
+    validos = partes.is_valid().to_numpy(zero_copy_only=False)
+
+    horas = pc.cast(pc.struct_field(partes, "horas"), pa.float64()).to_numpy(zero_copy_only=False)
+    minutos = pc.cast(pc.struct_field(partes, "minutos"), pa.float64()).to_numpy(zero_copy_only=False)
+    segundos = pc.cast(
+        pc.if_else(pc.equal(pc.struct_field(partes, "segundos"), ""), None, pc.struct_field(partes, "segundos")),
+        pa.float64(),
+    ).to_numpy(zero_copy_only=False)
+    negativos = pc.fill_null(pc.equal(pc.struct_field(partes, "sinal"), "-"), False).to_numpy(zero_copy_only=False)
+
+    total = horas * 60 + minutos + np.nan_to_num(segundos) / 60
+    total = np.where(negativos, -total, total)
+    total = np.where(validos, total, np.nan)
+
+    invalidos = np.flatnonzero(~validos & ~vazios)
+    erros = {
+        "total": int(invalidos.size),
+        "amostra": serie.index[invalidos[:amostra_erros]].tolist(),
+    }
+    return pd.Series(total, index=serie.index, name=serie.name), erros
+
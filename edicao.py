@@ -0,0 +1,107 @@
+# edicao.py
+import numpy as np
+import pandas as pd
+
+# Quantidades de linhas por página oferecidas no editor
+TAMANHOS_PAGINA = [50, 100, 500, 1000]
+
+
+def _mesmo_valor(antes, depois):
+    if pd.isna(antes) and pd.isna(depois):
+        return True
+    try:
+        return bool(antes == depois)
+    except (TypeError, ValueError):
+        return False
+
+
+def _valor_simples(valor):
+    """
+    Converte escalares do NumPy/pandas para tipos do Python (o registro fica serializável).
+    """
+    if valor is None or (not isinstance(valor, str) and pd.isna(valor)):
+        return None
+    if isinstance(valor, np.generic):
+        return valor.item()
+    if isinstance(valor, pd.Timestamp):
+        return valor.isoformat()
+    return valor
+
+
+def registrar_edicoes(registro, df, linhas_pagina, editadas):
+    """
+    Acrescenta ao registro as células alteradas no editor de uma página. Cada célula aparece uma
+    única vez (valor original e o mais recente); voltar ao valor original remove a entrada.
+
+    Parâmetros:
+    - registro (dict): Registro atual, {(linha, coluna): {'linha', 'coluna', 'antes', 'depois'}}. É alterado.
+    - df (DataFrame): Dados sem as edições (o índice identifica cada linha).
+    - linhas_pagina (Index): Identificadores das linhas exibidas na página, na ordem do editor.
+    - editadas (dict): Estado 'edited_rows' do st.data_editor ({posição na página: {coluna: valor}}).
+
+    Retorno:
+    - dict: O mesmo registro.
+    """
+    for posicao, colunas in editadas.items():
+        linha = int(linhas_pagina[int(posicao)])
+        for coluna, depois in colunas.items():
+            chave = (linha, coluna)
+            antes = registro[chave]["antes"] if chave in registro else _valor_simples(df.at[linha, coluna])
+            if _mesmo_valor(antes, depois):
+                registro.pop(chave, None)
+            else:
+                registro[chave] = {"linha": linha, "coluna": coluna, "antes": antes, "depois": _valor_simples(depois)}
+    return registro
+
+
+def aplicar_edicoes(df, edicoes):
+    """
+    Aplica o registro de edições sobre os dados, copiando apenas as colunas alteradas.
+    Linhas editadas que não estão nos dados (ex.: removidas por um filtro) são ignoradas.
+
+    Parâmetros:
+    - df (DataFrame): Dados (o índice identifica cada linha). Não é alterado.
+    - edicoes (list): Entradas do registro ({'linha', 'coluna', 'antes', 'depois'}).
+
+    Retorno:
+    - DataFrame: Os mesmos dados se não houver edições aplicáveis; senão, uma cópia rasa com as colunas editadas trocadas.
+    """
+    por_coluna = {}
+    for edicao in edicoes:
+        if edicao["coluna"] in df.columns:
+            por_coluna.setdefault(edicao["coluna"], []).append(edicao)
+    if not por_coluna:
+        return df
+
+    resultado = df.copy(deep=False)
+    for coluna, lista in por_coluna.items():
+        posicoes = df.index.get_indexer([edicao["linha"] for edicao in lista])
+        encontradas = posicoes >= 0
+        if not encontradas.any():
+            continue
+        valores = [edicao["depois"] for edicao, achou in zip(lista, encontradas) if achou]
+        serie = df[coluna].copy()
+        try:
+            serie.iloc[posicoes[encontradas]] = pd.array(valores, dtype=serie.dtype)
+        except (TypeError, ValueError):
+            # O valor novo não cabe no tipo da coluna (ex.: texto em coluna numérica)
+            serie = serie.astype(object)
+            serie.iloc[posicoes[encontradas]] = valores
+        resultado[coluna] = serie
+    return resultado
+
+
+def pagina(df, numero, tamanho):
+    """
+    Retorna a fatia de uma página dos dados (numeração a partir de 1).
+
+    Parâmetros:
+    - df (DataFrame): Dados.
+    - numero (int): Página.
+    - tamanho (int): Linhas por página.
+
+    Retorno:
+    - DataFrame: Linhas da página (sem cópia).
+    """
+    inicio = (numero - 1) * tamanho
+    return df.iloc[inicio:inicio + tamanho]
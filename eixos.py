@@ -0,0 +1,173 @@
+# eixos.py
+import math
+
+import numpy as np
+import pandas as pd
+
+# Quantidade máxima de rótulos em um eixo de categorias (o restante fica sem rótulo)
+MAXIMO_CATEGORIAS = 40
+
+# Intervalos aceitos para durações, em minutos (15 min, 30 min, 1 h, ... 1 dia)
+PASSOS_DURACAO = [15, 30, 60, 120, 180, 240, 360, 480, 720, 1440]
+
+# Intervalos aceitos para datas: (frequência do pandas, duração aproximada em segundos, formato do rótulo)
+PASSOS_DATA = [
+    ("1min", 60, "%d/%m/%Y %H:%M"),
+    ("5min", 300, "%d/%m/%Y %H:%M"),
+    ("15min", 900, "%d/%m/%Y %H:%M"),
+    ("30min", 1800, "%d/%m/%Y %H:%M"),
+    ("1h", 3600, "%d/%m/%Y %H:%M"),
+    ("3h", 3 * 3600, "%d/%m/%Y %H:%M"),
+    ("6h", 6 * 3600, "%d/%m/%Y %H:%M"),
+    ("12h", 12 * 3600, "%d/%m/%Y %H:%M"),
+    ("1D", 86400, "%d/%m/%Y"),
+    ("2D", 2 * 86400, "%d/%m/%Y"),
+    ("7D", 7 * 86400, "%d/%m/%Y"),
+    ("14D", 14 * 86400, "%d/%m/%Y"),
+    ("MS", 30 * 86400, "%m/%Y"),
+    ("3MS", 91 * 86400, "%m/%Y"),
+    ("6MS", 182 * 86400, "%m/%Y"),
+    ("YS", 365 * 86400, "%Y"),
+]
+
+
+def estatisticas_eixo(df, coluna, tipo=None, maximo_categorias=MAXIMO_CATEGORIAS):
+    """
+    Calcula, em uma única passada, o que o gerador de ticks precisa saber da coluna.
+    O resultado é pequeno e pode ficar em cache junto com os dados.
+
+    Parâmetros:
+    - df (DataFrame): Dados do gráfico.
+    - coluna (str): Coluna do eixo.
+    - tipo (str): Tipo inferido da coluna no esquema ('duracao' para minutos). Padrão é None.
+    - maximo_categorias (int): Categorias guardadas (espaçadas igualmente). Padrão é MAXIMO_CATEGORIAS.
+
+    Retorno:
+    - dict: {'eixo': 'duracao', 'numero', 'data' ou 'categoria', 'minimo', 'maximo', 'cardinalidade',
+      'categorias': [(posição, valor), ...]} (datas em nanossegundos).
+    """
+    if coluna not in df.columns:
+        raise ValueError(f"A coluna '{coluna}' não foi encontrada no DataFrame.")
+    serie = df[coluna]
+
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        datas = serie.dropna()
+        minimo = int(datas.min().value) if len(datas) else None
+        maximo = int(datas.max().value) if len(datas) else None
+        return {"eixo": "data", "minimo": minimo, "maximo": maximo, "cardinalidade": None, "categorias": []}
+
+    if pd.api.types.is_numeric_dtype(serie) and not pd.api.types.is_bool_dtype(serie):
+        valores = serie.to_numpy(dtype="float64", na_value=np.nan)
+        validos = valores[np.isfinite(valores)]
+        return {
+            "eixo": "duracao" if tipo == "duracao" else "numero",
+            "minimo": float(validos.min()) if len(validos) else None,
+            "maximo": float(validos.max()) if len(validos) else None,
+            "cardinalidade": None,
+            "categorias": [],
+        }
+
+    # Categorias na ordem em que aparecem (a mesma do eixo do Plotly); só uma amostra espaçada é guardada
+    unicos = pd.unique(serie)
+    posicoes = np.unique(np.linspace(0, len(unicos) - 1, min(len(unicos), maximo_categorias)).astype("int64")) if len(unicos) else []
+    return {
+        "eixo": "categoria",
+        "minimo": None,
+        "maximo": None,
+        "cardinalidade": len(unicos),
+        "categorias": [(int(posicao), unicos[posicao]) for posicao in posicoes],
+    }
+
+
+def passo_redondo(intervalo, divisoes):
+    """
+    Escolhe um passo "redondo" (1, 2, 2,5 ou 5 vezes uma potência de 10) que divide o intervalo
+    em no máximo cerca de `divisoes` partes.
+    """
+    bruto = intervalo / max(divisoes, 1)
+    if bruto <= 0 or not math.isfinite(bruto):
+        return 1.0
+    potencia = 10 ** math.floor(math.log10(bruto))
+    for fator in (1, 2, 2.5, 5, 10):
+        if fator * potencia >= bruto:
+            return fator * potencia
+    return 10 * potencia
+
+
+def rotulo_minutos(minutos):
+    """
+    Formata minutos como H:MM (ex.: 90 -> '1:30').
+    """
+    minutos = int(round(minutos))
+    sinal = "-" if minutos < 0 else ""
+    return f"{sinal}{abs(minutos) // 60}:{abs(minutos) % 60:02}"
+
+
+def _casas_decimais(passo):
+    return len(f"{passo:.10f}".rstrip("0").partition(".")[2])
+
+
+def _ticks_numericos(minimo, maximo, passo):
+    inicio = math.floor(min(minimo, 0) / passo) * passo  # O eixo Y começa no zero
+    fim = math.ceil(maximo / passo) * passo
+    quantidade = int(round((fim - inicio) / passo)) + 1
+    casas = _casas_decimais(passo)
+    return [round(inicio + i * passo, casas) for i in range(quantidade)]
+
+
+def _rotulo_numero(valor, passo):
+    # Formato brasileiro: ponto no milhar e vírgula nos decimais
+    texto = f"{valor:,.{_casas_decimais(passo)}f}"
+    return texto.replace(",", "X").replace(".", ",").replace("X", ".")
+
+
+def gerar_ticks(estatisticas, divisoes=10, passo_minimo=None):
+    """
+    Gera os valores e rótulos dos ticks a partir das estatísticas da coluna, sem reler os dados.
+
+    Parâmetros:
+    - estatisticas (dict): Resultado de estatisticas_eixo.
+    - divisoes (int): Quantidade aproximada de intervalos no eixo. Padrão é 10.
+    - passo_minimo (float): Menor intervalo aceito entre ticks de duração, em minutos. Padrão é None.
+
+    Retorno:
+    - tick_vals (list): Valores dos ticks (índices para categorias, textos ISO para datas).
+    - tick_texts (list): Rótulos dos ticks.
+    """
+    eixo = estatisticas["eixo"]
+
+    if eixo == "categoria":
+        posicoes = [posicao for posicao, _ in estatisticas["categorias"]]
+        return posicoes, [str(valor) for _, valor in estatisticas["categorias"]]
+
+    minimo, maximo = estatisticas["minimo"], estatisticas["maximo"]
+    if minimo is None:
+        return [], []
+
+    if eixo == "data":
+        segundos = (maximo - minimo) / 1e9
+        frequencia, _, formato = next(
+            (passo for passo in PASSOS_DATA if passo[1] * divisoes >= segundos),
+            PASSOS_DATA[-1],
+        )
+        inicio, fim = pd.Timestamp(minimo), pd.Timestamp(maximo)
+        datas = pd.date_range(inicio.floor("D") if frequencia[-1] in "DS" else inicio.floor("min"), fim, freq=frequencia)
+        if frequencia == "YS" and len(datas) > divisoes:
+            datas = datas[::math.ceil(len(datas) / divisoes)]
+        return [data.isoformat() for data in datas], [data.strftime(formato) for data in datas]
+
+    if eixo == "duracao":
+        intervalo = maximo - min(minimo, 0)
+        passo = next((passo for passo in PASSOS_DURACAO if passo * divisoes >= intervalo), None)
+        if passo is None:
+            # Mais de 10 dias: múltiplos redondos de 1 dia
+            passo = passo_redondo(intervalo / 1440, divisoes) * 1440
+        passo = max(passo, passo_minimo or 0)
+        valores = _ticks_numericos(minimo, maximo, passo)
+        return valores, [rotulo_minutos(valor) for valor in valores]
+
+    if maximo == minimo == 0:
+        return [0], ["0"]
+    passo = passo_redondo(maximo - min(minimo, 0), divisoes)
+    valores = _ticks_numericos(minimo, maximo, passo)
+    return valores, [_rotulo_numero(valor, passo) for valor in valores]
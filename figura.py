@@ -0,0 +1,514 @@
+# figura.py
+import hashlib
+import json
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from cache import CACHE
+from reducao import ORCAMENTO_PONTOS, converter_janela, reduzir_serie
+from transporte import FiguraBinaria
+
+# Tipos de gráfico oferecidos na barra lateral (rótulo -> valor usado na especificação)
+TIPOS_GRAFICO = {
+    "Barras": "barras",
+    "Linhas": "linhas",
+    "Dispersão": "dispersao",
+}
+
+# Acima de quantas barras o texto dentro delas deixa de ser montado e enviado (não caberia na tela)
+LIMITE_TEXTO_BARRAS = 500
+
+# Tamanho mínimo da fonte do texto nas barras; em barras estreitas demais o texto é escondido
+TAMANHO_MINIMO_TEXTO = 8
+
+# A partir de quantos pontos desenhados as linhas e a dispersão passam a usar WebGL (Scattergl)
+LIMITE_WEBGL = 5000
+
+# A partir de quantas categorias de cor o gráfico passa a usar um único trace com cores por barra
+LIMITE_TRACOS = 20
+
+# Quantidade máxima de itens exibidos na legenda no modo de trace único
+MAXIMO_LEGENDA = 20
+
+# Orçamento (bytes estimados no JSON da figura) para os dados do tooltip
+ORCAMENTO_HOVER_BYTES = 4 * 1024 ** 2
+
+# Quantidade de campos sugerida por padrão para o tooltip
+MAXIMO_CAMPOS_HOVER = 5
+
+# Separadores dos números formatados pelo Plotly: vírgula decimal e ponto no milhar (padrão brasileiro)
+SEPARADORES = ",."
+
+
+def usar_cor_unica(df, x, cor, limite_tracos=LIMITE_TRACOS):
+    """
+    Indica se o gráfico deve usar um único trace colorido por barra em vez de um trace por categoria.
+    Isso acontece quando a cor repete o eixo X (padrão) ou quando a coluna de cor tem muitas categorias.
+
+    Parâmetros:
+    - df (DataFrame): Dados do gráfico.
+    - x (str): Coluna do eixo X.
+    - cor (str): Coluna de cor.
+    - limite_tracos (int): Número de categorias a partir do qual o modo é ativado. Padrão é LIMITE_TRACOS.
+
+    Retorno:
+    - bool: True para o modo de trace único.
+    """
+    if not cor or pd.api.types.is_numeric_dtype(df[cor]):
+        return False  # Cores numéricas já usam escala contínua em um único trace
+    return cor == x or df[cor].nunique(dropna=False) > limite_tracos
+
+
+def cores_por_codigo(codigos, paleta):
+    """
+    Monta o marcador de um trace com uma cor por ponto a partir dos códigos das categorias.
+    As cores vão como números numa escala discreta: validar milhares de nomes de cor é lento.
+
+    Parâmetros:
+    - codigos (ndarray): Código da categoria de cada ponto (pd.factorize).
+    - paleta (ndarray): Cores usadas em ciclo.
+
+    Retorno:
+    - dict: Propriedades do marcador ('color', 'colorscale', 'cmin', 'cmax').
+    """
+    total = len(paleta)
+    escala = [[limite, cor] for i, cor in enumerate(paleta.tolist()) for limite in (i / total, (i + 1) / total)]
+    return {"color": codigos % total, "colorscale": escala, "cmin": -0.5, "cmax": total - 0.5}
+
+
+def barras_cor_unica(df, x, y, cor, text=None, custom_data=None, labels=None, hover_name=None,
+                     paleta=None, maximo_legenda=MAXIMO_LEGENDA):
+    """
+    Monta um gráfico de barras com um único trace, codificando a cor de cada barra em um array.
+    A legenda é limitada às primeiras categorias, com um item final indicando quantas ficaram de fora.
+
+    Parâmetros:
+    - df (DataFrame): Dados do gráfico.
+    - x, y (str): Colunas dos eixos.
+    - cor (str): Coluna cujas categorias definem a cor de cada barra.
+    - text (str): Coluna com o texto das barras. Padrão é None.
+    - custom_data (list): Séries enviadas como customdata (tooltip). Padrão é None.
+    - labels (dict): Rótulos dos eixos e da legenda ({coluna: rótulo}). Padrão é None.
+    - hover_name (Series): Texto do tooltip de cada barra (hovertext). Padrão é None.
+    - paleta (list): Cores usadas em ciclo. Padrão é a paleta qualitativa do Plotly.
+    - maximo_legenda (int): Itens exibidos na legenda. Padrão é MAXIMO_LEGENDA.
+
+    Retorno:
+    - go.Figure: Figura com um trace de barras e a legenda resumida.
+    """
+    labels = labels or {}
+    paleta = np.array(paleta or px.colors.qualitative.Plotly)
+    codigos, categorias = pd.factorize(df[cor], use_na_sentinel=False)
+
+    fig = go.Figure(go.Bar(
+        x=df[x],
+        y=df[y],
+        text=df[text] if text else None,
+        customdata=np.column_stack(custom_data) if custom_data else None,
+        hovertext=hover_name,
+        marker=cores_por_codigo(codigos, paleta),
+        showlegend=False,
+    ))
+
+    legenda_resumida(fig, categorias, paleta, go.Bar, maximo_legenda)
+
+    fig.update_layout(
+        barmode="relative",
+        xaxis_title=labels.get(x, x),
+        yaxis_title=labels.get(y, y),
+        legend_title_text=labels.get(cor, cor),
+    )
+    return fig
+
+
+def montar_barras(df, x, y, cor=None, text=None, custom_data=None, labels=None, hover_name=None):
+    """
+    Monta o gráfico de barras principal, escolhendo entre um trace por categoria (px.bar)
+    e o modo de trace único para colunas de cor com muitas categorias.
+
+    Parâmetros:
+    - df (DataFrame): Dados do gráfico.
+    - x, y (str): Colunas dos eixos.
+    - cor (str): Coluna de cor. Padrão é None.
+    - text (str): Coluna com o texto das barras. Padrão é None.
+    - custom_data (list): Séries enviadas como customdata (tooltip). Padrão é None.
+    - labels (dict): Rótulos dos eixos e da legenda. Padrão é None.
+    - hover_name (Series): Texto do tooltip de cada barra (hovertext). Padrão é None.
+
+    Retorno:
+    - go.Figure: Figura de barras.
+    """
+    if usar_cor_unica(df, x, cor):
+        return barras_cor_unica(df, x, y, cor, text=text, custom_data=custom_data, labels=labels, hover_name=hover_name)
+    return px.bar(df, x=x, y=y, color=cor, text=text, labels=labels, custom_data=custom_data, hover_name=hover_name)
+
+
+def _juntar_series(series):
+    """
+    Junta as posições de várias séries em uma só, com -1 entre elas (vira uma lacuna na linha).
+    """
+    partes = []
+    for serie in series:
+        partes.extend([serie, np.array([-1])])
+    return np.concatenate(partes[:-1]) if partes else np.array([], dtype="int64")
+
+
+def _tomar(valores, posicoes):
+    """
+    Seleciona as posições de um array ou Series; posições -1 viram nulos (lacunas).
+    """
+    lacunas = posicoes < 0
+    if isinstance(valores, pd.Series):
+        tomados = valores.iloc[np.where(lacunas, 0, posicoes)].reset_index(drop=True)
+        return tomados.where(~lacunas) if lacunas.any() else tomados
+    tomados = np.asarray(valores)[np.where(lacunas, 0, posicoes)]
+    if lacunas.any():
+        tomados = tomados.astype("float64" if tomados.dtype.kind in "iuf" else object)
+        tomados[lacunas] = np.nan if tomados.dtype.kind == "f" else None
+    return tomados
+
+
+def legenda_resumida(fig, categorias, paleta, classe, maximo_legenda=MAXIMO_LEGENDA, **opcoes):
+    """
+    Acrescenta a legenda de um trace colorido por categoria (cores_por_codigo): só as primeiras
+    categorias ganham um item (traces vazios, sem dados), e um item final diz quantas ficaram de fora.
+
+    Parâmetros:
+    - fig (go.Figure): Figura que recebe os itens.
+    - categorias (Index): Categorias na ordem dos códigos (pd.factorize).
+    - paleta (ndarray): Cores usadas em ciclo, as mesmas do trace.
+    - classe (type): Tipo dos traces da legenda (ex.: go.Bar, go.Scatter).
+    - maximo_legenda (int): Itens exibidos na legenda. Padrão é MAXIMO_LEGENDA.
+    - **opcoes: Propriedades extras de cada item (ex.: mode='markers').
+    """
+    for i, categoria in enumerate(categorias[:maximo_legenda]):
+        fig.add_trace(classe(x=[None], y=[None], name=str(categoria), marker_color=paleta[i % len(paleta)], hoverinfo="skip", **opcoes))
+    restantes = len(categorias) - maximo_legenda
+    if restantes > 0:
+        fig.add_trace(classe(x=[None], y=[None], name=f"… +{restantes} categorias", marker_color="rgba(0,0,0,0)", hoverinfo="skip", **opcoes))
+
+
+def montar_linhas(df, x, y, cor=None, custom_data=None, hover_name=None, modo="lines", janela=None,
+                  limite_pontos=ORCAMENTO_PONTOS, paleta=None):
+    """
+    Monta um gráfico de linhas ou de dispersão. As linhas são ordenadas pelo eixo X e reduzidas
+    com LTTB ao orçamento de pontos; acima de LIMITE_WEBGL pontos o desenho passa para WebGL.
+
+    Parâmetros:
+    - df (DataFrame): Dados do gráfico.
+    - x, y (str): Colunas dos eixos.
+    - cor (str): Coluna que separa as séries. Padrão é None.
+    - custom_data (list): Séries enviadas como customdata (tooltip). Padrão é None.
+    - hover_name (Series): Texto do tooltip de cada ponto (hovertext). Padrão é None.
+    - modo (str): 'lines' (linhas) ou 'markers' (dispersão). Padrão é 'lines'.
+    - janela (list): [início, fim] do eixo X em zoom; só essa faixa é desenhada. Padrão é None.
+    - limite_pontos (int): Pontos por linha após a redução. Padrão é ORCAMENTO_PONTOS.
+    - paleta (list): Cores usadas em ciclo. Padrão é a paleta qualitativa do Plotly.
+
+    Retorno:
+    - go.Figure: Figura com um trace por categoria de cor (ou um único trace, com legenda resumida, com muitas categorias
+      ou com cor numérica, em escala contínua).
+    """
+    paleta = np.array(paleta or px.colors.qualitative.Plotly)
+    grupo = cor if cor and cor not in (x, y) else None
+    # Cor numérica não separa séries (seria um trace por valor distinto): colore os pontos em escala contínua
+    escala_continua = grupo is not None and _campo_numerico(df[grupo])
+    cor_unica = grupo is not None and usar_cor_unica(df, x, grupo)
+    customdata = np.column_stack(custom_data) if custom_data else None
+
+    series = reduzir_serie(
+        df, x, y,
+        grupo=None if escala_continua else grupo,
+        limite=limite_pontos if modo == "lines" else None,  # A dispersão não tem formato de linha a preservar
+        janela=converter_janela(df[x], janela),
+    )
+    classe = go.Scattergl if sum(len(serie) for serie in series) > LIMITE_WEBGL else go.Scatter
+
+    def trace(posicoes, mode=modo, **opcoes):
+        return classe(
+            x=_tomar(df[x], posicoes),
+            y=_tomar(df[y], posicoes),
+            customdata=_tomar(customdata, posicoes) if customdata is not None else None,
+            hovertext=_tomar(hover_name, posicoes) if hover_name is not None else None,
+            mode=mode,
+            **opcoes,
+        )
+
+    fig = go.Figure()
+    if grupo is None:
+        fig.add_trace(trace(_juntar_series(series), showlegend=False))
+    elif escala_continua:
+        # A linha fica com uma só cor; os pontos sobre ela mostram o valor da coluna de cor
+        posicoes = _juntar_series(series)
+        marcador = {"color": _tomar(df[grupo].astype("float64"), posicoes), "showscale": True, "colorbar": {"title": {"text": grupo}}}
+        estilo = {"mode": "lines+markers", "line_color": paleta[0]} if modo == "lines" else {}
+        fig.add_trace(trace(posicoes, showlegend=False, marker=marcador, **estilo))
+    elif cor_unica:
+        # Muitas categorias: um único trace (as linhas são separadas por lacunas; os pontos, coloridos um a um)
+        posicoes = _juntar_series(series) if modo == "lines" else np.concatenate(series)
+        if modo == "lines":
+            estilo = {"line_color": paleta[0]}
+        else:
+            codigos, categorias = pd.factorize(df[grupo], use_na_sentinel=False)
+            estilo = {"marker": cores_por_codigo(codigos[posicoes], paleta)}
+        fig.add_trace(trace(posicoes, showlegend=False, connectgaps=False, **estilo))
+        if modo != "lines":
+            legenda_resumida(fig, categorias, paleta, go.Scatter, mode="markers")
+    else:
+        for posicoes in series:
+            if len(posicoes):
+                nome = str(df[grupo].iloc[posicoes[0]])
+                fig.add_trace(trace(posicoes, name=nome))
+
+    # Com escala contínua não há legenda: a barra de cores identifica a coluna
+    fig.update_layout(xaxis_title=x, yaxis_title=y, legend_title_text=None if escala_continua else grupo)
+    return fig
+
+
+def _campo_numerico(serie):
+    return pd.api.types.is_numeric_dtype(serie) and not pd.api.types.is_bool_dtype(serie)
+
+
+def _campo_inteiro(serie):
+    # Inteiros (inclusive os que viraram float por causa de vazios) costumam ser códigos, como a matrícula
+    if pd.api.types.is_integer_dtype(serie):
+        return True
+    valores = serie.to_numpy(dtype="float64", na_value=np.nan)
+    valores = valores[~np.isnan(valores)]
+    return bool(len(valores)) and bool(np.all(valores == np.round(valores)))
+
+
+def estimar_bytes_hover(df, coluna, tamanho_amostra=1000):
+    """
+    Estima quantos bytes um campo do tooltip acrescenta ao JSON da figura.
+
+    Parâmetros:
+    - df (DataFrame): Dados do gráfico.
+    - coluna (str): Campo do tooltip.
+    - tamanho_amostra (int): Valores usados para estimar o tamanho médio dos textos. Padrão é 1000.
+
+    Retorno:
+    - int: Estimativa em bytes.
+    """
+    serie = df[coluna]
+    if _campo_numerico(serie):
+        return 12 * len(serie)  # Número no JSON, com separador
+    tamanho_medio = serie.head(tamanho_amostra).astype(str).str.len().mean()
+    return int((np.nan_to_num(tamanho_medio) + len(str(coluna)) + 6) * len(serie))
+
+
+def limitar_campos_hover(df, campos, orcamento=ORCAMENTO_HOVER_BYTES):
+    """
+    Mantém os campos do tooltip, na ordem escolhida, enquanto couberem no orçamento de bytes.
+    O primeiro campo é sempre mantido.
+
+    Parâmetros:
+    - df (DataFrame): Dados do gráfico.
+    - campos (list): Campos escolhidos para o tooltip.
+    - orcamento (int): Limite estimado em bytes. Padrão é ORCAMENTO_HOVER_BYTES.
+
+    Retorno:
+    - list: Campos que cabem no orçamento.
+    """
+    escolhidos, total = [], 0
+    for campo in campos:
+        total += estimar_bytes_hover(df, campo)
+        if total > orcamento and escolhidos:
+            break
+        escolhidos.append(campo)
+    return escolhidos
+
+
+def _texto_coluna(valores):
+    """
+    Converte uma coluna para texto Arrow (datas como dd/mm/aaaa, nulos como texto vazio).
+    """
+    if pd.api.types.is_datetime64_any_dtype(valores):
+        valores = valores.dt.strftime("%d/%m/%Y")
+    return pc.fill_null(pc.cast(pa.array(valores.astype("string[pyarrow]")), pa.string()), "")
+
+
+def montar_texto_barras(df, colunas, separador=" | ", maximo_caracteres=0):
+    """
+    Monta o texto exibido dentro das barras juntando as colunas escolhidas coluna a coluna (sem laço por linha).
+
+    Parâmetros:
+    - df (DataFrame): Dados do gráfico.
+    - colunas (list): Colunas que compõem o texto.
+    - separador (str): Texto entre os valores de cada coluna. Padrão é " | ".
+    - maximo_caracteres (int): Corta textos maiores que isso, terminando em "…". Padrão é 0 (sem corte).
+
+    Retorno:
+    - Series: Texto de cada linha.
+    """
+    texto = pc.binary_join_element_wise(*[_texto_coluna(df[col]) for col in colunas], separador)
+    if maximo_caracteres:
+        cortado = pc.binary_join_element_wise(pc.utf8_slice_codeunits(texto, 0, max(maximo_caracteres - 1, 0)), "…", "")
+        texto = pc.if_else(pc.greater(pc.utf8_length(texto), maximo_caracteres), cortado, texto)
+    return pd.Series(texto.to_numpy(zero_copy_only=False), index=df.index, dtype=object)
+
+
+def montar_texto_hover(df, colunas):
+    """
+    Junta os campos de texto do tooltip em uma única string por linha ("Coluna: valor<br>..."),
+    de forma vetorizada. Datas são formatadas como dd/mm/aaaa.
+
+    Parâmetros:
+    - df (DataFrame): Dados do gráfico.
+    - colunas (list): Campos de texto do tooltip.
+
+    Retorno:
+    - Series: Texto do tooltip de cada linha, ou None se não houver campos de texto.
+    """
+    if not colunas:
+        return None
+    partes = [pc.binary_join_element_wise(f"{col}: ", _texto_coluna(df[col]), "") for col in colunas]
+    return pd.Series(
+        pc.binary_join_element_wise(*partes, "<br>").to_numpy(zero_copy_only=False),
+        index=df.index,
+        dtype=object,
+    )
+
+
+# Gera o texto formatado para o tooltip: textos chegam prontos em %{hovertext}
+# e números vêm tipados no customdata (a posição 0 guarda o número da linha);
+# inteiros (códigos, matrículas) saem sem formatação, os demais com duas casas e separador de milhar
+def generate_hovertemplate(campos_texto, campos_numericos, campos_inteiros=()):
+    hover_text = ["<b>%{x}</b>"]
+    if campos_texto:
+        hover_text.append("%{hovertext}")
+    for i, col in enumerate(campos_numericos, start=1):
+        formato = "" if col in campos_inteiros else ":,.2~f"
+        hover_text.append(f"{col}: <span style='color:blue;'>%{{customdata[{i}]{formato}}}</span>")
+    return "<br>".join(hover_text) + "<extra></extra>"
+
+
+def impressao_dados(df):
+    """
+    Calcula uma impressão digital do conteúdo de um DataFrame (valores, nomes e tipos das colunas).
+
+    Parâmetros:
+    - df (DataFrame): Dados do gráfico.
+
+    Retorno:
+    - str: Hash hexadecimal que muda sempre que algum valor muda.
+    """
+    impressao = hashlib.blake2b(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes(), digest_size=16)
+    impressao.update(repr([(str(col), str(tipo)) for col, tipo in df.dtypes.items()]).encode())
+    return impressao.hexdigest()
+
+
+def construir_figura(df, spec):
+    """
+    Monta a figura completa a partir da especificação do gráfico.
+
+    Parâmetros:
+    - df (DataFrame): Dados do gráfico.
+    - spec (dict): Especificação com as chaves 'x', 'y', 'cor', 'texto', 'hover' (colunas do tooltip),
+      'tick_vals' e 'tick_texts', e opcionalmente 'tipo' (veja TIPOS_GRAFICO) e 'janela' (zoom do eixo X
+      em linhas e dispersão). Rótulos e título não fazem parte dela (veja aplicar_rotulos).
+
+    Retorno:
+    - go.Figure: Figura pronta para renderizar.
+    """
+    x, y, cor, texto = spec["x"], spec["y"], spec["cor"], spec["texto"]
+    tipo = spec.get("tipo", "barras")
+
+    # Campos numéricos seguem tipados no customdata; os de texto viram uma única string por barra
+    campos_numericos = [col for col in spec["hover"] if _campo_numerico(df[col])]
+    campos_texto = [col for col in spec["hover"] if col not in campos_numericos]
+    linhas = pd.Series(np.arange(len(df), dtype="float64"), index=df.index)
+
+    custom_data = [linhas] + [df[col].astype("float64") for col in campos_numericos]
+    hover_name = montar_texto_hover(df, campos_texto)
+
+    if tipo == "barras":
+        # Com barras demais o texto não caberia em nenhuma delas: nem é enviado
+        exibir_texto = len(df) <= LIMITE_TEXTO_BARRAS
+        texto = texto if exibir_texto else None
+        fig = montar_barras(df, x=x, y=y, cor=cor, text=texto, custom_data=custom_data, hover_name=hover_name)
+        fig.update_traces(
+            texttemplate='<b>%{text}</b>' if texto else '<b>%{x}</b>',  # Usa o valor do eixo X como texto padrão
+            textposition='inside' if exibir_texto else 'none',  # Garante que o texto apareça dentro das barras
+        )
+        # Esconde o texto das barras estreitas demais para mostrá-lo legível
+        fig.update_layout(uniformtext_minsize=TAMANHO_MINIMO_TEXTO, uniformtext_mode="hide")
+    else:
+        fig = montar_linhas(
+            df, x=x, y=y, cor=cor, custom_data=custom_data, hover_name=hover_name,
+            modo="lines" if tipo == "linhas" else "markers",
+            janela=spec.get("janela"),
+        )
+    campos_inteiros = [col for col in campos_numericos if _campo_inteiro(df[col])]
+    fig.update_traces(hovertemplate=generate_hovertemplate(campos_texto, campos_numericos, campos_inteiros))
+
+    # Adicionar ticks personalizados ao gráfico
+    fig.update_layout(
+        separators=SEPARADORES,
+        yaxis=dict(
+            range=[0, None],  # Inicia no zero
+            tickmode="array",
+            tickvals=spec["tick_vals"],
+            ticktext=spec["tick_texts"],
+        )
+    )
+    return fig
+
+
+def copiar_figura(fig, binario=False):
+    """
+    Cria uma cópia da figura que pode receber alterações de layout sem afetar a figura em cache.
+    Com binario=True, a cópia é enviada ao navegador com os arrays numéricos em formato binário tipado.
+    """
+    classe = FiguraBinaria if binario else go.Figure
+    return classe(data=fig.data, layout=fig.layout)
+
+
+def aplicar_rotulos(fig, rotulos):
+    """
+    Atualiza apenas o layout da figura (rótulos dos eixos, título da legenda e título do gráfico),
+    sem reconstruir os traces. A figura é alterada no próprio objeto.
+
+    Parâmetros:
+    - fig (go.Figure): Figura própria da sessão (veja copiar_figura).
+    - rotulos (dict): Textos com as chaves 'x', 'y', 'legenda' e 'titulo'.
+
+    Retorno:
+    - go.Figure: A mesma figura, já com os rótulos aplicados.
+    """
+    return fig.update_layout(
+        title=rotulos["titulo"],
+        xaxis_title=rotulos["x"],
+        yaxis_title=rotulos["y"],
+        legend_title_text=rotulos["legenda"],
+    )
+
+
+def figura_guardada(spec, impressao):
+    """
+    Indica se a figura da especificação já está montada para os dados com essa impressão.
+    """
+    return CACHE.contem(("figura", impressao, json.dumps(spec, sort_keys=True, default=str)))
+
+
+def figura_em_cache(df, spec, impressao=None):
+    """
+    Retorna a figura da especificação, montando-a apenas se a mesma combinação de dados e
+    especificação ainda não tiver sido vista. A figura retornada é compartilhada e não deve ser alterada.
+
+    Parâmetros:
+    - df (DataFrame): Dados do gráfico.
+    - spec (dict): Especificação aceita por construir_figura.
+    - impressao (str): Impressão dos dados, se já conhecida. Padrão é None (calculada aqui).
+
+    Retorno:
+    - go.Figure: Figura pronta para renderizar.
+    """
+    # Figuras ficam no cache compartilhado: (impressão dos dados, especificação) -> go.Figure
+    chave = ("figura", impressao or impressao_dados(df), json.dumps(spec, sort_keys=True, default=str))
+    return CACHE.obter_ou_calcular(chave, lambda: construir_figura(df, spec))
@@ -0,0 +1,162 @@
+# filtros.py
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from duracao import converter_duracao_para_minutos
+
+# Durações zeradas ("0:00", "00:00", "00:00:00") contam como vazias
+PADRAO_DURACAO_ZERO = r"^\s*0+:0+(:0+)?\s*$"
+
+# Textos tratados como vazios além das células em branco (compatível com o filtro antigo)
+TEXTOS_VAZIOS = ["", "00:00"]
+
+
+def _texto_arrow(serie):
+    return pc.utf8_trim_whitespace(pc.cast(pa.array(serie.astype("string[pyarrow]")), pa.string()))
+
+
+def mascara_preenchidos(serie, tipo=None):
+    """
+    Marca as linhas em que a coluna tem valor, com a noção de "vazio" de cada tipo:
+    durações zeradas, zero nos números, False nos booleanos e "00:00" ou texto em branco nos demais.
+
+    Parâmetros:
+    - serie (Series): Coluna a testar.
+    - tipo (str): Tipo inferido da coluna no esquema (ex.: 'duracao'). Padrão é None.
+
+    Retorno:
+    - ndarray: Máscara booleana (True = linha mantida).
+    """
+    if tipo == "duracao":
+        texto = _texto_arrow(serie)
+        vazios = pc.or_kleene(pc.equal(texto, ""), pc.match_substring_regex(texto, PADRAO_DURACAO_ZERO))
+        return ~pc.fill_null(vazios, True).to_numpy(zero_copy_only=False)
+    if pd.api.types.is_bool_dtype(serie):
+        return serie.fillna(False).to_numpy(dtype=bool)
+    if pd.api.types.is_numeric_dtype(serie):
+        valores = serie.to_numpy(dtype="float64", na_value=np.nan)
+        return ~np.isnan(valores) & (valores != 0)
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return serie.notna().to_numpy()
+    vazios = pc.is_in(_texto_arrow(serie), value_set=pa.array(TEXTOS_VAZIOS))
+    return ~pc.fill_null(vazios, True).to_numpy(zero_copy_only=False)
+
+
+def valores_comparaveis(serie, tipo=None):
+    """
+    Converte a coluna para valores que podem ser comparados com os limites de uma faixa:
+    minutos para durações, instantes para datas e números para as colunas numéricas.
+
+    Parâmetros:
+    - serie (Series): Coluna.
+    - tipo (str): Tipo inferido da coluna no esquema. Padrão é None.
+
+    Retorno:
+    - ndarray: Valores float64 (NaN onde não há valor), ou None se a coluna não aceitar faixa.
+    """
+    if not aceita_intervalo(serie, tipo):
+        return None
+    if tipo == "duracao":
+        minutos, _ = converter_duracao_para_minutos(serie)
+        return minutos.to_numpy(dtype="float64", na_value=np.nan)
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        datas = serie.to_numpy(dtype="datetime64[ns]")
+        return np.where(np.isnat(datas), np.nan, datas.astype("int64").astype("float64"))
+    return serie.to_numpy(dtype="float64", na_value=np.nan)
+
+
+def aceita_intervalo(serie, tipo=None):
+    """
+    Indica se a coluna aceita filtro por faixa (números, datas ou durações).
+    """
+    return (
+        tipo == "duracao"
+        or pd.api.types.is_datetime64_any_dtype(serie)
+        or (pd.api.types.is_numeric_dtype(serie) and not pd.api.types.is_bool_dtype(serie))
+    )
+
+
+def _limite_numerico(valor, serie):
+    if valor is None:
+        return None
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return float(pd.Timestamp(valor).value)
+    return float(valor)
+
+
+def mascara_intervalo(serie, minimo=None, maximo=None, tipo=None):
+    """
+    Marca as linhas cujo valor está dentro da faixa [minimo, maximo] (limites inclusivos).
+
+    Parâmetros:
+    - serie (Series): Coluna numérica, de datas ou de duração.
+    - minimo, maximo: Limites da faixa (minutos para durações; None = sem limite). Padrão é None.
+    - tipo (str): Tipo inferido da coluna no esquema. Padrão é None.
+
+    Retorno:
+    - ndarray: Máscara booleana (linhas sem valor ficam de fora).
+    """
+    valores = valores_comparaveis(serie, tipo)
+    if valores is None:
+        raise ValueError(f"A coluna '{serie.name}' não aceita filtro por faixa.")
+    mascara = ~np.isnan(valores)
+    minimo, maximo = _limite_numerico(minimo, serie), _limite_numerico(maximo, serie)
+    if minimo is not None:
+        mascara &= valores >= minimo
+    if maximo is not None:
+        mascara &= valores <= maximo
+    return mascara
+
+
+def limites_coluna(df, coluna, tipo=None):
+    """
+    Retorna o menor e o maior valor de uma coluna que aceita faixa (para montar o controle do filtro).
+
+    Parâmetros:
+    - df (DataFrame): Dados.
+    - coluna (str): Coluna.
+    - tipo (str): Tipo inferido da coluna no esquema. Padrão é None.
+
+    Retorno:
+    - tuple: (mínimo, máximo) no tipo da coluna (minutos para durações), ou None se não houver valores.
+    """
+    valores = valores_comparaveis(df[coluna], tipo)
+    if valores is None or np.isnan(valores).all():
+        return None
+    minimo, maximo = np.nanmin(valores), np.nanmax(valores)
+    if pd.api.types.is_datetime64_any_dtype(df[coluna]):
+        return pd.Timestamp(int(minimo)).to_pydatetime(), pd.Timestamp(int(maximo)).to_pydatetime()
+    return float(minimo), float(maximo)
+
+
+def linhas_filtradas(df, regras, esquema=None):
+    """
+    Calcula uma máscara por regra, combina todas e devolve as posições das linhas mantidas.
+    Nenhuma coluna é alterada e nenhuma cópia dos dados é feita.
+
+    Parâmetros:
+    - df (DataFrame): Dados base (não são alterados).
+    - regras (list): Regras no formato {'coluna', 'regra': 'preenchidos'} ou
+      {'coluna', 'regra': 'intervalo', 'minimo', 'maximo'}.
+    - esquema (dict): Tipo inferido por coluna. Padrão é None.
+
+    Retorno:
+    - ndarray: Posições (iloc) das linhas que passam em todas as regras, ou None se não houver regras.
+    """
+    esquema = esquema or {}
+    mascaras = []
+    for regra in regras:
+        coluna = regra["coluna"]
+        if coluna not in df.columns:
+            continue
+        if regra["regra"] == "preenchidos":
+            mascaras.append(mascara_preenchidos(df[coluna], esquema.get(coluna)))
+        elif regra["regra"] == "intervalo":
+            mascaras.append(mascara_intervalo(df[coluna], regra.get("minimo"), regra.get("maximo"), esquema.get(coluna)))
+        else:
+            raise ValueError(f"Regra de filtro desconhecida: {regra['regra']}")
+    if not mascaras:
+        return None
+    return np.flatnonzero(np.logical_and.reduce(mascaras))
@@ -1,9 +1,26 @@
 import pandas as pd
-import plotly.express as px
 import streamlit as st
 from observacao import get_markdown  # Importa o Markdown
 from config_page import config_page
-import numpy as np
+from agregacao import COLUNA_REGISTROS, FUNCOES_AGREGACAO, ROTULO_OUTROS, agregar
+from figura import (
+    LIMITE_TEXTO_BARRAS, MAXIMO_CAMPOS_HOVER, TIPOS_GRAFICO,
+    aplicar_rotulos, copiar_figura, figura_em_cache, figura_guardada, limitar_campos_hover,
+)
+from filtros import aceita_intervalo, limites_coluna
+from pipeline import (
+    adicionar_minutos, adicionar_texto_barras, filtrar, impressao_etapa, materializar, ordenar, reordenar_colunas,
+)
+from eixos import estatisticas_eixo, gerar_ticks
+from edicao import TAMANHOS_PAGINA, aplicar_edicoes, pagina, registrar_edicoes
+from ingestao import (
+    carregar_dados, chave_tabela, fatia_em_cache, impressao_conteudo, ingerir_arquivo, ler_cabecalho, ler_previa,
+    listar_planilhas, tabela_em_disco,
+)
+from tarefas import iniciar_tarefa
+from diagnostico import Medidor, bytes_figura
+from transporte import relatorio_transporte
+import uuid
 
 # Configuração da página deve ser o primeiro comando
 st.set_page_config(
@@ -17,163 +34,122 @@ st.set_page_config(
 if "expand_file_uploader" not in st.session_state:
     st.session_state["expand_file_uploader"] = True
 
-# Função para verificar e ordenar colunas, incluindo diferentes tipos de dados
-def ordenar_coluna(df, coluna, ascending):
-    if coluna == "Horas Extras":
-        # Tratamento para colunas de tempo (HH:MM)
-        df["Horas Extras Minutos"] = df["Horas Extras"].apply(convert_time_to_minutes)
-        df = df.sort_values(by="Horas Extras Minutos", ascending=ascending)
-        df["Horas Extras"] = df["Horas Extras Minutos"].apply(minutes_to_time)
-        df = df.drop(columns=["Horas Extras Minutos"])
-    elif pd.api.types.is_numeric_dtype(df[coluna]):
-        # Ordenação para colunas numéricas
-        df = df.sort_values(by=coluna, ascending=ascending)
-    elif pd.api.types.is_datetime64_any_dtype(df[coluna]):
-        # Ordenação para colunas de datas
-        df[coluna] = pd.to_datetime(df[coluna], errors='coerce')
-        df = df.sort_values(by=coluna, ascending=ascending)
-    else:
-        # Ordenação para colunas de strings
-        df = df.sort_values(by=coluna, ascending=ascending, key=lambda col: col.str.lower())
-    return df
-
 config_page()
 
-# Função para converter tempo em formato HH:MM para minutos
-# Variável global para controlar mensagens de erro
-error_displayed = False
+# Exibe um único aviso por coluna de tempo com a contagem de células inválidas e exemplos de linhas
+def avisar_erros_duracao(coluna, erros):
+    if erros["total"]:
+        amostra = ", ".join(str(indice) for indice in erros["amostra"])
+        st.error(
+            f"⚠️ Erro ao processar os dados: {erros['total']} valor(es) fora do formato HH:MM "
+            f"na coluna '{coluna}' (ex.: linhas {amostra}). Esses valores foram tratados como vazios."
+        )
 
-# Função para converter tempo em formato HH:MM para minutos
-@st.cache_data
-def convert_time_to_minutes(time_str):
-    global error_displayed
-    try:
-        hours, minutes = map(int, time_str.split(":"))
-        return hours * 60 + minutes
-    except AttributeError:
-        if not error_displayed:
-            st.error(
-                "⚠️ Erro ao processar os dados: Um valor numérico foi encontrado na coluna de tempo. "
-                "Certifique-se de que todos os valores na coluna estejam no formato HH:MM."
-            )
-            error_displayed = True  # Marca o erro como exibido
-        return None
-    except ValueError:
-        if not error_displayed:
-            st.error(
-                "⚠️ Erro ao processar os dados: Um valor inesperado foi encontrado na coluna de tempo. "
-                "Certifique-se de que todos os valores estejam no formato correto (HH:MM)."
-            )
-            error_displayed = True  # Marca o erro como exibido
-        return None
-
-# Função para converter minutos de volta para o formato HH:MM
-@st.cache_data
-def minutes_to_time(minutes):
-    if minutes is None:
-        return "00:00"  # Retorna '00:00' para valores None
-    hours = minutes // 60
-    mins = minutes % 60
-    return f"{hours}:{mins:02}"
+# Impressão do conteúdo do upload, calculada uma única vez por envio (o file_id muda a cada novo upload);
+# nos reruns seguintes todos os caches são consultados por ela, sem reler nem copiar o arquivo
+def impressao_upload(uploaded_file):
+    impressoes = st.session_state.setdefault("impressoes_upload", {})
+    if uploaded_file.file_id not in impressoes:
+        impressoes.clear()  # Só o upload atual interessa
+        impressoes[uploaded_file.file_id] = impressao_conteudo(uploaded_file.getbuffer())
+    return impressoes[uploaded_file.file_id]
 
 # Função para carregar os dados do arquivo
-@st.cache_data
-def load_data(uploaded_file, skip_rows=0):
-    if uploaded_file.name.endswith(".csv"):
-        df = pd.read_csv(uploaded_file, skiprows=skip_rows)
-    elif uploaded_file.name.endswith(".xlsx"):
-        df = pd.read_excel(uploaded_file, skiprows=skip_rows)
-    else:
-        return None
-
-    # Conversão automática de colunas com valores numéricos para float/int
-    for col in df.columns:
-        # Tenta converter cada coluna para numérica
-        df[col] = pd.to_numeric(df[col], errors='ignore')  # 'ignore' mantém strings como estão
-
-    return df
-
-
-# Gera o texto formatado para o tooltip dinamicamente e colorido
-def generate_hovertemplate(selected_columns):
-    hover_text = []
-    for i, col in enumerate(selected_columns):
-        hover_text.append(
-            f"<b style='color:black'>{col}:</b> <span style='color:blue'>%{{customdata[{i}]}}</span><br>"
+def load_data(uploaded_file, skip_rows=0, progresso=None, planilha=None, medidor=None, impressao=None):
+    medidor = medidor or Medidor()
+    impressao = impressao or impressao_upload(uploaded_file)  # Fora da sessão (em segundo plano) chega pronta
+    # O upload é convertido para Arrow em disco uma única vez por conteúdo (e por planilha, no XLSX);
+    # mudar as linhas a descartar apenas refaz a fatia sobre a tabela mapeada em memória
+    # getbuffer() não copia o arquivo; o conteúdo só é lido se a tabela ainda não estiver no cache em disco
+    with medidor.etapa("ingerir"):
+        chave = ingerir_arquivo(
+            uploaded_file.name, uploaded_file.getbuffer(), progresso, planilha=planilha, impressao=impressao
         )
-    return "".join(hover_text) + "<extra></extra>"
-
-# Função para ordenar colunas de acordo com o tipo de dado
-# Função para gerar ticks para o eixo Y (tempo em minutos, valores numéricos ou categorias)
-def generate_ticks(df, column, divisions=10, min_step=5, reverse=False):
+    if chave is None:
+        return None, {}, [], None
+
+    # Todas as colunas são carregadas: filtros e ordenação podem usar colunas que não são exibidas
+    # (as colunas de "SELECIONAR Colunas para Exibir" só são aplicadas ao materializar)
+    colunas_arquivo = ler_cabecalho(chave, skip_rows)
+    with medidor.etapa("load_data", cache="acerto" if fatia_em_cache(chave, skip_rows) else "falta") as medida:
+        df, esquema = carregar_dados(chave, skip_rows, progresso)
+        medida.update(linhas=df.shape[0], colunas=df.shape[1])
+    return df, esquema, colunas_arquivo, f"{chave}:{skip_rows}"
+
+
+# Espera (segundos) pela carga antes de mostrar o progresso: cargas já em cache terminam antes disso
+ESPERA_CARGA = 0.5
+
+# Carga executada em segundo plano (sem acesso à sessão): prévia das primeiras linhas, se o arquivo
+# ainda não tiver sido convertido, e depois a carga completa, que para no próximo lote se for cancelada.
+# A tarefa tem o seu próprio medidor: quem recebe os dados junta as medidas à execução em que os recebeu
+def carregar_em_segundo_plano(tarefa, uploaded_file, skip_rows, planilha, impressao, medir):
+    medidor = Medidor(ativo=medir)
+    dados = uploaded_file.getbuffer()
+    if not tabela_em_disco(chave_tabela(uploaded_file.name, dados, planilha, impressao)):
+        tarefa.previa = ler_previa(uploaded_file.name, dados, planilha=planilha, impressao=impressao)
+    return load_data(uploaded_file, skip_rows, tarefa.progresso, planilha, medidor, impressao), medidor
+
+# Cada sessão acompanha uma única carga; um novo upload ou outros parâmetros cancelam a anterior
+# (sessões que pedem a mesma carga acompanham a mesma tarefa, que só para quando todas desistem)
+def tarefa_carga(uploaded_file, skip_rows, planilha, medir=False):
+    impressao = impressao_upload(uploaded_file)
+    chave = (impressao, uploaded_file.name, skip_rows, planilha)
+    atual = st.session_state.get("tarefa_carga")
+    if atual is not None and atual.chave == chave and not atual.cancelada:
+        return atual
+    if atual is not None:
+        atual.cancelar()
+    tarefa = iniciar_tarefa(chave, carregar_em_segundo_plano, uploaded_file, skip_rows, planilha, impressao, medir)
+    st.session_state["tarefa_carga"] = tarefa
+    return tarefa
+
+# Acompanha a carga em andamento sem bloquear a página (a barra fica no painel CARREGAR ARQUIVO);
+# ao terminar, refaz a página com os dados
+@st.fragment(run_every=1)
+def acompanhar_carga(tarefa):
+    if tarefa.concluida:
+        st.rerun()
+    st.progress(tarefa.fracao, text=f"⏳ {tarefa.mensagem}...")
+
+# Prévia das primeiras linhas na área principal enquanto a carga não termina (aparece assim que for lida)
+@st.fragment(run_every=1)
+def exibir_previa(tarefa):
+    if tarefa.previa is not None:
+        st.caption(f"Prévia: primeiras {len(tarefa.previa)} linhas do arquivo, como estão (use :red[**Linhas**] :blue[**a Descartar**] para pular títulos)")
+        st.dataframe(tarefa.previa, use_container_width=True)
+
+
+# Função para gerar ticks para o eixo Y (tempo em minutos, valores numéricos, datas ou categorias)
+def generate_ticks(df, column, divisions=10, min_step=5, reverse=False, tipo=None, estatisticas=None):
     """
     Gera os valores e rótulos (ticks) para o eixo Y de um gráfico, adaptando-se ao tipo de dado.
+    Os intervalos são "redondos" (1, 2, 2,5 ou 5 × 10ⁿ; 15/30/60 minutos; dias, meses ou anos)
+    e eixos de categorias recebem no máximo MAXIMO_CATEGORIAS rótulos.
     
     Parâmetros:
     - df (DataFrame): O DataFrame contendo os dados.
     - column (str): Nome da coluna para a qual os ticks serão gerados.
     - divisions (int): Número máximo de divisões desejadas no eixo. Padrão é 10.
-    - min_step (int): Valor mínimo para o intervalo entre os ticks. Padrão é 5.
+    - min_step (int): Intervalo mínimo entre os ticks de duração, em minutos. Padrão é 5.
     - reverse (bool): Define se os ticks devem ser exibidos em ordem decrescente. Padrão é False.
+    - tipo (str): Tipo inferido da coluna no esquema (ex.: 'duracao' para valores em minutos). Padrão é None.
+    - estatisticas (dict): Estatísticas já calculadas da coluna (veja estatisticas_eixo); evita reler os dados. Padrão é None.
     
     Retorno:
     - tick_vals (list): Lista de valores para os ticks.
     - tick_texts (list): Lista de rótulos para os ticks (formato adaptado, ex.: HH:MM).
     """
-    try:
-        # Verificação se a coluna existe no DataFrame
-        if column not in df.columns:
-            raise ValueError(f"A coluna '{column}' não foi encontrada no DataFrame.")
-
-        # Caso seja a coluna de "Horas Extras Minutos" (tempo em minutos)
-        if column == "Horas Extras Minutos":
-            max_val = int(df[column].max())  # Valor máximo convertido para inteiro
-            tick_step = max(30, max_val // divisions)  # Intervalo mínimo de 30 minutos
-            tick_vals = list(range(0, max_val + tick_step, tick_step))  # Criação dos valores
-            tick_texts = [minutes_to_time(val) for val in tick_vals]  # Conversão para HH:MM
-
-        # Caso a coluna seja numérica (inteiros ou decimais)
-        elif pd.api.types.is_numeric_dtype(df[column]):
-            max_val = df[column].max()
-            min_val = df[column].min()
-            tick_vals = list(np.linspace(min_val, max_val, divisions))  # Divisão uniforme dos valores
-            tick_vals = [round(x, 2) for x in tick_vals]  # Arredondamento para 2 casas decimais
-            tick_texts = tick_vals  # Para numéricos, os rótulos são os próprios valores
-
-        # Caso a coluna seja categórica ou outro tipo
-        else:
-            unique_vals = df[column].unique()
-            tick_vals = list(range(len(unique_vals)))  # Índices para as categorias
-            tick_texts = unique_vals  # Os rótulos são os valores únicos
+    if estatisticas is None:
+        estatisticas = estatisticas_eixo(df, column, tipo)
+    tick_vals, tick_texts = gerar_ticks(estatisticas, divisions, passo_minimo=min_step)
 
-        # Reversão dos ticks, se necessário
-        if reverse:
-            tick_vals.reverse()
-            tick_texts.reverse()
+    # Reversão dos ticks, se necessário
+    if reverse:
+        tick_vals.reverse()
+        tick_texts.reverse()
 
-        return tick_vals, tick_texts  # Retorna os valores e rótulos dos ticks
-
-    except Exception as e:
-        # Tratamento de erros e retorno de valores padrão
-        print(f"Erro ao gerar ticks: {e}")
-        return [], []
-
-# Função auxiliar para converter minutos no formato HH:MM
-def minutes_to_time(minutes):
-    """
-    Converte minutos inteiros para o formato HH:MM.
-    
-    Parâmetros:
-    - minutes (int): Valor em minutos.
-    
-    Retorno:
-    - str: Representação no formato HH:MM.
-    """
-    if minutes is None:
-        return "00:00"  # Retorna um valor padrão para entradas inválidas
-    hours = minutes // 60
-    mins = minutes % 60
-    return f"{hours}:{mins:02}"
+    return tick_vals, tick_texts  # Retorna os valores e rótulos dos ticks
 
 # Criação das colunas
 col1, col2 = st.sidebar.columns([0.2, 1])
@@ -184,28 +160,123 @@ with col1:
 with col2:
     st.subheader("📈:rainbow[**DADOS e GRÁFICOS**] Estatísticos", divider="rainbow")
        
-def exibir_grafico(uploaded_file=None):
+# Renomear eixos e títulos roda isolado (fragmento): digitar nos campos só atualiza o layout da figura já montada
+@st.fragment
+def exibir_grafico_renomeavel(x_axis, y_axis, color_col, tipo_grafico="barras"):
+    with st.popover(":blue[**RENOMEAR**] Eixos e Título do Gráfico", icon=":material/insert_text:"):
+        x_label = st.text_input(":blue[**➡️ Eixo X**]", value=x_axis, help="Insira um rótulo para o eixo X")
+        y_label = st.text_input(":blue[**⬆️ Eixo Y**]", value=y_axis, help="Insira um rótulo para o eixo Y")
+        legend_title = st.text_input(":blue[**Legenda**]", value=color_col if color_col else "Legenda", help="Insira um título para a legenda")
+        title = st.text_input(":blue[**Título do Gráfico**]", value="📊 Estatísticas", help="Insira um título para o gráfico")
+
+    fig = aplicar_rotulos(
+        st.session_state["figura"],
+        {"x": x_label, "y": y_label, "legenda": legend_title, "titulo": title}
+    )
+
+    # Em linhas e dispersão, a seleção por caixa funciona como zoom: o trecho é redesenhado em resolução completa
+    versao = st.session_state.setdefault("versao_grafico", 0)
+    if tipo_grafico != "barras" and st.session_state.get("janela_x"):
+        if st.button(":blue[**Restaurar**] visão completa", icon=":material/zoom_out_map:"):
+            st.session_state["janela_x"] = None
+            st.session_state["versao_grafico"] += 1  # Nova chave descarta a seleção anterior do gráfico
+            st.rerun()
+
+    # Renderizar o gráfico (clicar ou selecionar barras mostra as linhas completas abaixo)
+    evento = st.plotly_chart(fig, use_container_width=True, key=f"main_graph_{versao}", on_select="rerun", selection_mode=("points", "box"))
+
+    caixas = [caixa for caixa in evento.selection.box if len(caixa.get("x", [])) == 2]
+    if tipo_grafico != "barras" and caixas:
+        st.session_state["janela_x"] = (x_axis, list(caixas[-1]["x"]))
+        st.session_state["versao_grafico"] += 1
+        st.rerun()
+
+    linhas = sorted({int(ponto["customdata"][0]) for ponto in evento.selection.points if ponto.get("customdata")})
+    if linhas:
+        st.caption(f"📄 {len(linhas)} linha(s) selecionada(s)")
+        st.dataframe(st.session_state["dados_grafico"].iloc[linhas], use_container_width=True)
+
+# Painel de diagnóstico: tempo, memória, tamanho dos dados e uso do cache de cada etapa da execução
+def exibir_diagnostico(medidor):
+    with st.sidebar.expander(":blue[**DIAGNÓSTICO**] Etapas _(opcional)_", expanded=False, icon=":material/monitoring:"):
+        st.checkbox(
+            ":blue[**Medir etapas**]", key="diagnostico",
+            help="Mede tempo, memória e cache de cada etapa e grava uma linha JSON por etapa no log do servidor"
+        )
+        tabela = medidor.finalizar()
+        if not tabela.empty:
+            total = medidor.total
+            memoria = f" · pico de memória {total['pico_rss_mb']:.0f} MB (+{total['pico_rss_delta_mb']:.0f})" if "pico_rss_mb" in total else ""
+            st.caption(f"Execução {medidor.execucao}: {total['segundos']:.2f} s{memoria}")
+            cache = total["cache"]
+            acertos = f"{cache['taxa_acerto']:.0%} de acertos" if cache["taxa_acerto"] is not None else "sem consultas"
+            st.caption(
+                f"Cache: {acertos} · {cache['entradas']} entrada(s) · {cache['bytes'] / 1024 ** 2:.0f} de "
+                f"{cache['limite_bytes'] / 1024 ** 2:.0f} MB · {cache['despejos']} despejo(s) · {cache['expirados']} expirada(s)"
+            )
+            st.dataframe(tabela, hide_index=True, use_container_width=True)
+
+def exibir_grafico(uploaded_file=None, area_progresso=None):
     # Inicializa text_col com None
     text_col = None
 
     if not uploaded_file:
+        tarefa = st.session_state.pop("tarefa_carga", None)
+        if tarefa is not None:
+            tarefa.cancelar()  # O arquivo foi removido: a carga pendente não interessa mais
         st.markdown(get_markdown())
         return
 
+    # Diagnóstico (opcional): mede cada etapa desta execução; a opção fica no painel ao fim da barra lateral
+    medidor = Medidor(ativo=st.session_state.get("diagnostico", False), sessao=st.session_state.setdefault("id_sessao", uuid.uuid4().hex[:8]))
+
+    area_carga = st.container()  # Prévia e avisos do arquivo carregado
+
     try:
         # Configuração inicial
         with st.sidebar.expander(":blue[**AJUSTAR**] Colunas e Linhas", expanded=False, icon=":material/tune:"):
+            # Seleção da planilha (apenas para arquivos XLSX)
+            planilha = None
+            if uploaded_file.name.endswith(".xlsx"):
+                planilha = st.selectbox(":green[**Planilha**]", options=listar_planilhas(uploaded_file.getbuffer(), impressao_upload(uploaded_file)), index=0, help="Selecione a planilha do arquivo")
             skip_rows = st.number_input(":red[**Linhas**] :blue[**a Descartar**]", min_value=0, value=0, step=1, placeholder="Quantas linhas pular", help="Número de linhas a serem ignoradas no início do arquivo")
-            df = load_data(uploaded_file, skip_rows)
+            # A carga roda em segundo plano; se não terminar logo, a página mostra o progresso e
+            # continua respondendo (mudar as linhas a descartar ou o arquivo cancela esta carga)
+            tarefa = tarefa_carga(uploaded_file, skip_rows, planilha, medidor.ativo)
+            if not tarefa.aguardar(ESPERA_CARGA):
+                with area_progresso if area_progresso is not None else area_carga:
+                    acompanhar_carga(tarefa)
+                with area_carga:
+                    exibir_previa(tarefa)
+                return
+            try:
+                (df, esquema, colunas_arquivo, impressao), medidas_carga = tarefa.resultado()
+            except Exception:
+                st.session_state.pop("tarefa_carga", None)  # Carga com erro: a próxima execução tenta de novo
+                raise
+            if st.session_state.get("carga_medida") is not tarefa:
+                st.session_state["carga_medida"] = tarefa  # As etapas da carga entram uma única vez por sessão
+                medidor.incorporar(medidas_carga)
 
             if df is None or df.empty:
                 st.error("Tipo de arquivo não suportado ou arquivo vazio.")
                 return
 
+            # Colunas em que "1.250" tanto pode ser milhar quanto decimal ficam em texto, com um aviso
+            for coluna in [col for col, tipo in esquema.items() if tipo == "numero_ambiguo"]:
+                area_carga.warning(
+                    f"A coluna '{coluna}' mistura números com ponto de milhar e com ponto decimal "
+                    "(ex.: '1.250' e '3.5'); ela foi mantida como texto."
+                )
+
+            # Cada transformação abaixo é uma etapa do pipeline: só é refeita se a sua entrada
+            # ou os seus parâmetros mudarem (a impressão de cada saída encadeia a etapa seguinte)
+            etapa = impressao_etapa(impressao, "carregar", {"colunas": list(df.columns)})
+
             # Primeira Coluna
             primary_col = st.selectbox(":green[**Primeira**] :blue[**Coluna**]", options=df.columns, index=0, help=":blue[**Selecione**] a primeira coluna para exibir")
             if primary_col:
-                df = df[[primary_col] + [col for col in df.columns if col != primary_col]]
+                df, etapa = medidor.executar_etapa("primeira_coluna", reordenar_colunas, df, etapa, primeira=primary_col)
 
             # # Filtro de valores nulos
             # filter_col = st.selectbox(":red[**Excluir**] :blue[**Valores Nulos**]", [None] + list(df.columns), help="Selecione a coluna para filtrar valores nulos")
@@ -216,59 +287,99 @@ def exibir_grafico(uploaded_file=None):
 
 
 
-            # Filtro de valores nulos
-            filter_col = st.selectbox(":red[**Excluir**] :blue[**Valores Nulos**]", [None] + list(df.columns), help="Selecione a coluna para filtrar valores nulos")
-            
-            if filter_col:
-                df[filter_col] = df[filter_col].replace("00:00", pd.NA)
-            
-                # Converter para tipo numérico se possível (para lidar com 0 e 1)
-                if df[filter_col].dtype == "object":
-                    df[filter_col] = pd.to_numeric(df[filter_col], errors="ignore")
-            
-                # Tratar colunas booleanas (False e 0 como nulos)
-                if df[filter_col].dtype == "bool":
-                    df[filter_col] = df[filter_col].replace({False: pd.NA})
-                elif df[filter_col].dtype in ["int64", "float64"]:
-                    df[filter_col] = df[filter_col].replace({0: pd.NA})
-            
-                # Remover valores nulos
-                df = df.dropna(subset=[filter_col])
-                df = df.reset_index(drop=True)
-            
-
-
+            # Filtros: uma máscara por regra, combinadas em uma seleção de linhas sobre os dados carregados
+            regras = []
+            filter_cols = st.multiselect(
+                ":red[**Excluir**] :blue[**Valores Nulos**]", list(df.columns),
+                placeholder="Colunas que não podem ficar vazias",
+                help="Remove as linhas com a coluna vazia ('00:00', zero e False também contam como vazio)"
+            )
+            regras += [{"coluna": col, "regra": "preenchidos"} for col in filter_cols]
 
-            # Ordenação do eixo X
+            faixa_cols = st.multiselect(
+                ":red[**Filtrar**] :blue[**por Faixa**]",
+                [col for col in df.columns if aceita_intervalo(df[col], esquema.get(col))],
+                placeholder="Números, datas ou durações",
+                help="Mantém só as linhas com o valor da coluna dentro da faixa escolhida"
+            )
+            for col in faixa_cols:
+                limites, _ = medidor.executar_etapa("limites", limites_coluna, df, etapa, coluna=col, tipo=esquema.get(col))
+                if limites is None or limites[0] == limites[1]:
+                    continue  # Sem valores ou com um único valor não há faixa a escolher
+                rotulo = f"{col} _(minutos)_" if esquema.get(col) == "duracao" else col
+                faixa = st.slider(rotulo, min_value=limites[0], max_value=limites[1], value=limites)
+                if tuple(faixa) != tuple(limites):
+                    regras.append({"coluna": col, "regra": "intervalo", "minimo": faixa[0], "maximo": faixa[1]})
+
+            selecao, etapa = medidor.executar_etapa("filtrar", filtrar, df, etapa, regras=regras, esquema=esquema)
+
+            # Ordenação do eixo X (a ordem de cada coluna fica em cache para as linhas já filtradas;
+            # trocar o sentido não refaz o filtro nem a ordenação, só reaplica a permutação)
             sort_col_x = st.selectbox(":green[**Ordenar**] :blue[**eixo X por**]", options=df.columns, index=0, help="Selecione a coluna para ordenar")
             sort_ascending_x = st.checkbox(":blue[**Ordem crescente para eixo X**]", value=True)
             if sort_col_x:
-                df = ordenar_coluna(df, sort_col_x, sort_ascending_x)
+                selecao, etapa = medidor.executar_etapa(
+                    "ordenar", ordenar, selecao, etapa,
+                    coluna=sort_col_x, ascending=sort_ascending_x, tipo=esquema.get(sort_col_x), impressao=etapa,
+                )
 
         # Seleção de Colunas para Exibição
         with st.sidebar.expander(":blue[**SELECIONAR**] Colunas para Exibir", expanded=False, icon=":material/rule:"):
             selected_columns = st.multiselect(
                 ":red[**Exibir colunas**]",
-                df.columns,
-                default=df.columns,
+                colunas_arquivo,
+                default=colunas_arquivo,
                 placeholder="Selecione as colunas para exibir",
                 help="Selecione as colunas que deseja exibir no gráfico.",
                 key="selected_columns"
             )
 
-        # Filtra o DataFrame com base nas colunas selecionadas
-        if selected_columns:
-            df_filtered = df[selected_columns]
-        else:
-            df_filtered = df  # Se nenhuma coluna for selecionada, mostra todas as colunas
-
-        # Exibição de Dados com Data Editor
+        # Monta as linhas filtradas e ordenadas só com as colunas selecionadas (se nenhuma for selecionada, mostra todas)
+        df_filtered, etapa = medidor.executar_etapa("materializar", materializar, selecao, etapa, colunas=selected_columns)
+
+        # Exibição de Dados com Data Editor: só a página visível vai para o navegador, e as edições
+        # ficam num registro (linha, coluna, antes, depois) aplicado sobre os dados em cache
+        # O registro vale só para os dados carregados: outro arquivo, planilha ou linhas descartadas começam sem edições
+        if st.session_state.get("impressao_edicoes") != impressao:
+            st.session_state["impressao_edicoes"] = impressao
+            st.session_state["edicoes"] = {}
+            st.session_state["versao_editor"] = st.session_state.get("versao_editor", 0) + 1  # Descarta o editor anterior
+        registro = st.session_state["edicoes"]
         with st.expander(":blue[**DADOS**] EDITAR E VISUALIZAR", icon=":material/format_list_bulleted:"):
-            df_filtered = st.data_editor(
-                df_filtered.reset_index(drop=True),  # Reseta o índice para evitar duplicação
-                use_container_width=True,
-                num_rows="dynamic"  # Permite o ajuste dinâmico do número de linhas
+            col_pagina, col_tamanho = st.columns([1, 1])
+            with col_tamanho:
+                tamanho_pagina = st.selectbox(":blue[**Linhas por página**]", TAMANHOS_PAGINA, index=1)
+            total_paginas = max(1, -(-len(df_filtered) // tamanho_pagina))
+            with col_pagina:
+                numero_pagina = st.number_input(":blue[**Página**]", min_value=1, value=1, step=1, key="pagina_editor")
+            numero_pagina = min(numero_pagina, total_paginas)  # O filtro pode ter reduzido o número de páginas
+
+            # Cada página tem o seu editor; as alterações pendentes entram no registro antes de montar a página
+            chave_editor = f"editor_dados_{numero_pagina}_{tamanho_pagina}_{st.session_state.setdefault('versao_editor', 0)}"
+            linhas_pagina = pagina(df_filtered, numero_pagina, tamanho_pagina).index
+            estado_editor = st.session_state.get(chave_editor) or {}
+            registrar_edicoes(registro, df_filtered, linhas_pagina, estado_editor.get("edited_rows", {}))
+
+            edicoes = sorted(registro.values(), key=lambda edicao: (edicao["linha"], edicao["coluna"]))
+            df_filtered, etapa = medidor.executar_etapa("editar", aplicar_edicoes, df_filtered, etapa, edicoes=edicoes)
+
+            inicio = (numero_pagina - 1) * tamanho_pagina
+            st.caption(
+                f"Página {numero_pagina} de {total_paginas} · Linhas {inicio + 1}–{min(inicio + tamanho_pagina, len(df_filtered))} "
+                f"de {len(df_filtered)} · {len(edicoes)} célula(s) editada(s)"
             )
+            with medidor.etapa("editor") as medida:
+                dados_pagina = pagina(df_filtered, numero_pagina, tamanho_pagina)
+                medida.update(linhas=dados_pagina.shape[0], colunas=dados_pagina.shape[1])
+                st.data_editor(
+                    dados_pagina,  # O índice identifica a linha nos dados carregados
+                    use_container_width=True,
+                    key=chave_editor
+                )
+            if edicoes and st.button(":red[**Desfazer**] edições", icon=":material/undo:"):
+                registro.clear()
+                st.session_state["versao_editor"] += 1  # Novo editor, sem as alterações pendentes
+                st.rerun()
 
 
         # Seleção de colunas para texto nas barras
@@ -280,12 +391,19 @@ def exibir_grafico(uploaded_file=None):
                 default=[],  # Nenhuma coluna selecionada por padrão
                 help="Selecione as colunas que deseja exibir como texto dentro das barras"
             )
+            maximo_caracteres = st.number_input(
+                ":blue[**Máximo de caracteres**] _(0 = sem limite)_", min_value=0, value=0, step=5,
+                help="Textos maiores são cortados e terminam em '…'"
+            )
         
         # Criar o texto para as barras
-        if text_cols:
-            # Concatenar valores das colunas selecionadas em uma nova coluna "Texto Barras"
-            df_filtered["Texto Barras"] = df_filtered[text_cols].apply(
-                lambda row: " | ".join(row.values.astype(str)), axis=1
+        if text_cols and len(df_filtered) > LIMITE_TEXTO_BARRAS:
+            st.info(f"Texto nas barras omitido: o gráfico tem mais de {LIMITE_TEXTO_BARRAS} barras.")
+        elif text_cols:
+            # Concatenar valores das colunas selecionadas em uma nova coluna "Texto Barras" (coluna a coluna)
+            df_filtered, etapa = medidor.executar_etapa(
+                "texto_barras", adicionar_texto_barras, df_filtered, etapa,
+                colunas=text_cols, maximo_caracteres=maximo_caracteres, nome="Texto Barras",
             )
             text_col = "Texto Barras"
         else:
@@ -295,6 +413,11 @@ def exibir_grafico(uploaded_file=None):
         # Configuração de Gráficos
         # Configuração de Gráficos
         with st.sidebar.expander(":blue[**ESCOLHER**] Eixos e Legendas", expanded=False, icon=":material/checklist:"):
+            rotulo_tipo = st.radio(
+                ":blue[**Tipo de gráfico**]", list(TIPOS_GRAFICO), horizontal=True,
+                help="Linhas longas são reduzidas ao que a tela consegue mostrar; selecione um trecho para vê-lo em detalhe"
+            )
+            tipo_grafico = TIPOS_GRAFICO[rotulo_tipo]
             x_axis = st.selectbox(":blue[**➡️ Eixo X**]", df_filtered.columns)
             y_axis = st.selectbox(":blue[**⬆️ Eixo Y**]", df_filtered.columns)
         
@@ -308,129 +431,121 @@ def exibir_grafico(uploaded_file=None):
             # Caso nenhuma coluna seja selecionada, use os valores de x e y como padrão
             if color_col == "Selecione":
                 color_col = x_axis  # Usa o eixo X como padrão para colorir
-        
-                    
 
-        # Converter a coluna "Horas Extras" para minutos apenas se ela for escolhida como eixo Y
-        if y_axis == "Horas Extras" and "Horas Extras" in df_filtered.columns:
-            df_filtered["Horas Extras Minutos"] = df_filtered["Horas Extras"].apply(convert_time_to_minutes)
-            y_axis = "Horas Extras Minutos"  # Usa a nova coluna para lógica do gráfico
-
-        # Gerar os ticks para o eixo Y
-        tick_vals, tick_texts = generate_ticks(df_filtered, y_axis)
-
-        # Criação do Gráfico Principal
-        # Criação do Gráfico Principal
-        if x_axis and y_axis:
-            labels = {x_axis: x_axis, y_axis: y_axis}
-            if color_col:
-                labels[color_col] = color_col  # Adiciona rótulo para a cor
-        
-            fig = px.bar(
-                df_filtered,
-                x=x_axis,
-                y=y_axis,
-                color=color_col,  # Usa o color_col ajustado
-                text=text_col if text_col else None,
-                labels=labels,
-                custom_data=[df_filtered[col].fillna('') for col in selected_columns]
+            # Campos do tooltip: só o que for escolhido aqui vai para o navegador junto com cada barra
+            hover_columns = st.multiselect(
+                ":blue[**Campos no tooltip**]",
+                options=df_filtered.columns,
+                default=list(df_filtered.columns[:MAXIMO_CAMPOS_HOVER]),
+                placeholder="Campos exibidos ao passar o mouse",
+                help="Cada campo é enviado junto com todas as barras; escolha apenas o necessário"
             )
         
+                    
 
-            # Configurar o texto para aparecer dentro das barras e ajustar o tooltip
-            fig.update_traces(
-                texttemplate='<b>%{text}</b>' if text_col else '<b>%{x}</b>',  # Usa o valor do eixo X como texto padrão
-                textposition='inside',  # Garante que o texto apareça dentro das barras
-                hovertemplate="<b>%{x}</b><br>" + "<br>".join(
-                    [f"{col}: <span style='color:blue;'>%{{customdata[{i}]}}</span>" for i, col in
-                     enumerate(selected_columns)])
-            )
-            
-            
-
-            # Adicionar título e ticks personalizados ao gráfico
-            fig.update_layout(
-                title="📊 Estatísticas",
-                yaxis=dict(
-                    range=[0, None],  # Inicia no zero
-                    tickmode="array",
-                    tickvals=tick_vals,
-                    ticktext=tick_texts,
-                    title="Horas Extras"
-                )
+        # Converter colunas de duração (HH:MM) para minutos apenas se forem escolhidas como eixo Y
+        tipo_y = esquema.get(y_axis)
+        if tipo_y == "duracao" and y_axis in df_filtered.columns:
+            coluna_minutos = f"{y_axis} Minutos"
+            (df_filtered, erros), etapa = medidor.executar_etapa("minutos", adicionar_minutos, df_filtered, etapa, coluna=y_axis, nome=coluna_minutos)
+            avisar_erros_duracao(y_axis, erros)
+            y_axis = coluna_minutos  # Usa a nova coluna para lógica do gráfico
+
+        # Agregação no servidor: envia ao gráfico apenas um ponto por grupo, e não uma barra por linha
+        with st.sidebar.expander(":blue[**AGRUPAR**] Dados _(opcional)_", expanded=False, icon=":material/functions:"):
+            funcao_agregacao = st.selectbox(
+                ":blue[**Agrupar por eixo X**]",
+                ["Nenhuma"] + list(FUNCOES_AGREGACAO),
+                index=0,
+                help="Agrupa as linhas pelo eixo X (e pela coluna de cor) e resume o eixo Y"
             )
-
-        # Expander para renomear os eixos e título do gráfico
-        with st.sidebar.expander(":blue[**RENOMEAR**] Eixos e Título do Gráfico", expanded=False, icon=":material/insert_text:"):
-            x_label = st.text_input(":blue[**➡️ Eixo X**]", value=x_axis, help="Insira um rótulo para o eixo X")
-            y_label = st.text_input(":blue[**⬆️ Eixo Y**]", value=y_axis, help="Insira um rótulo para o eixo Y")
-            legend_title = st.text_input(":blue[**Legenda**]", value=color_col if color_col else "Legenda", help="Insira um título para a legenda")
-            title = st.text_input(":blue[**Título do Gráfico**]", value="📊 Estatísticas", help="Insira um título para o gráfico")
-
-        # Configuração de rótulos para o gráfico
-        labels = {x_axis: x_label, y_axis: y_label}
-        if color_col:
-            labels[color_col] = legend_title
-
-        # Criação do Gráfico Principal
-        if x_axis and y_axis:
-            fig = px.bar(
-                df_filtered,
-                x=x_axis,
-                y=y_axis,
-                color=color_col,
-                text=text_col if "text_col" in locals() else None,
-                labels=labels,
-                custom_data=[df_filtered[col].fillna('') for col in selected_columns]
+            top_n = st.number_input(
+                ":blue[**Top N**] _(0 = todas)_", min_value=0, value=0, step=1,
+                help=f"Mantém as N maiores categorias do eixo X e junta o restante em '{ROTULO_OUTROS}'"
             )
 
-            # # Configurar o texto para aparecer dentro das barras e ajustar o tooltip
-            # fig.update_traces(
-            #     texttemplate='<b>%{text}</b>' if "text_col" in locals() else None,
-            #     textposition='inside',
-            #     hovertemplate="<b>%{x}</b><br>" + "<br>".join(
-            #         [f"{col}: <span style='color:blue;'>%{{customdata[{i}]}}</span>" for i, col in
-            #          enumerate(selected_columns)])
-            # )
-
-
-
-
-            fig.update_traces(
-                texttemplate='<b>%{text}</b>' if text_col and text_col in df_filtered.columns else '<b>%{x}</b>',
-                textposition='inside',  # Garante que o texto apareça dentro das barras
-                hovertemplate="<b>%{x}</b><br>" + "<br>".join(
-                    [f"{col}: <span style='color:blue;'>%{{customdata[{i}]}}</span>" for i, col in enumerate(selected_columns)]
-                ) + "<extra></extra>"  # Remove o texto extra no tooltip
+        if funcao_agregacao != "Nenhuma":
+            funcao = FUNCOES_AGREGACAO[funcao_agregacao]
+            if funcao != "count" and not pd.api.types.is_numeric_dtype(df_filtered[y_axis]):
+                st.warning(f"A coluna '{y_axis}' não é numérica; os dados foram agrupados por contagem.")
+                funcao = "count"
+            df_filtered, etapa = medidor.executar_etapa(
+                "agregar", agregar, df_filtered, etapa,
+                x=x_axis, y=y_axis, cor=color_col, funcao=funcao, top_n=top_n,
             )
-            
-
-
+            if y_axis not in df_filtered.columns:
+                y_axis = COLUNA_REGISTROS  # Y era o próprio eixo X: plota a contagem
+            if funcao == "count" or y_axis == COLUNA_REGISTROS:
+                tipo_y = None  # Contagens são números simples, não durações ou datas
+            hover_columns = list(df_filtered.columns)  # O tooltip passa a mostrar os valores agregados
+            text_col = None  # O texto por linha não existe mais após o agrupamento
+
+        # Respeita o orçamento de bytes do tooltip
+        campos_hover = limitar_campos_hover(df_filtered, [col for col in hover_columns if col in df_filtered.columns])
+        if len(campos_hover) < len(hover_columns):
+            st.warning(f"Tooltip limitado a {len(campos_hover)} campo(s) para manter o gráfico leve.")
+        hover_columns = campos_hover
 
+        # Gerar os ticks para o eixo Y
+        # As estatísticas do eixo (mínimo, máximo, categorias) ficam em cache; os ticks saem só delas
+        estatisticas, _ = medidor.executar_etapa("estatisticas_eixo", estatisticas_eixo, df_filtered, etapa, coluna=y_axis, tipo=tipo_y)
+        tick_vals, tick_texts = generate_ticks(df_filtered, y_axis, tipo=tipo_y, estatisticas=estatisticas)
 
-            # Adicionar título e ticks personalizados ao gráfico
-            fig.update_layout(
-                title=title,
-                yaxis=dict(
-                    range=[0, None],  # Inicia no zero
-                    tickmode="array",
-                    tickvals=tick_vals,
-                    ticktext=tick_texts,
-                    title=y_label  # Usa o rótulo personalizado para o eixo Y
-                ),
-                xaxis=dict(
-                    title=x_label  # Usa o rótulo personalizado para o eixo X
+        # Criação do Gráfico Principal (uma única vez, reaproveitada enquanto a especificação não mudar)
+        if x_axis and y_axis:
+            spec = {
+                "x": x_axis,
+                "y": y_axis,
+                "cor": color_col,
+                "texto": text_col if text_col and text_col in df_filtered.columns else None,
+                "hover": hover_columns,
+                "tick_vals": list(tick_vals),
+                "tick_texts": list(tick_texts),
+                "tipo": tipo_grafico,
+            }
+            janela = st.session_state.get("janela_x")
+            if tipo_grafico != "barras" and janela and janela[0] == x_axis:
+                spec["janela"] = janela[1]  # Trecho escolhido com a seleção por caixa
+            with medidor.etapa("figura", cache="acerto" if figura_guardada(spec, etapa) else "falta") as medida:
+                fig = figura_em_cache(df_filtered, spec, impressao=etapa)
+                medida.update(linhas=df_filtered.shape[0], colunas=df_filtered.shape[1])
+
+            # Transporte binário (opcional): arrays numéricos vão ao navegador em base64 em vez de listas JSON
+            with st.sidebar.expander(":blue[**DESEMPENHO**] Gráfico _(opcional)_", expanded=False, icon=":material/speed:"):
+                transporte_binario = st.checkbox(
+                    ":blue[**Transporte binário**]", value=False,
+                    help="Envia os valores numéricos do gráfico como arrays tipados (menor e mais rápido em gráficos grandes)"
+                )
+                relatorio = st.empty()
+
+            # Cada sessão guarda a sua cópia da figura; renomear só altera o layout dessa cópia
+            if st.session_state.get("figura_base") is not fig or st.session_state.get("figura_binaria") != transporte_binario:
+                st.session_state["figura_base"] = fig
+                st.session_state["figura_binaria"] = transporte_binario
+                st.session_state["figura"] = copiar_figura(fig, binario=transporte_binario)
+                st.session_state["relatorio_transporte"] = relatorio_transporte(fig) if transporte_binario else None
+                st.session_state["bytes_figura"] = None
+
+            if st.session_state["relatorio_transporte"]:
+                medidas = st.session_state["relatorio_transporte"]
+                relatorio.caption(
+                    f"JSON {medidas['json_bytes'] / 1e6:.2f} MB ({medidas['json_ms']:.0f} ms) → "
+                    f"binário {medidas['binario_bytes'] / 1e6:.2f} MB ({medidas['binario_ms']:.0f} ms)"
                 )
-            )
-
-            with st.expander(":blue[**GRÁFICO**] DE BARRAS", expanded=True, icon=":material/finance:"):
 
-                # Renderizar o gráfico
-                st.plotly_chart(fig, use_container_width=True, key="main_graph")
+            st.session_state["dados_grafico"] = df_filtered  # Consulta sob demanda das linhas selecionadas
+            if medidor.ativo and st.session_state.get("bytes_figura") is None:
+                st.session_state["bytes_figura"] = bytes_figura(st.session_state["figura"])  # Medido uma vez por figura
+            with st.expander(f":blue[**GRÁFICO**] DE {rotulo_tipo.upper()}", expanded=True, icon=":material/finance:"):
+                with medidor.etapa("renderizar") as medida:
+                    medida["bytes"] = st.session_state.get("bytes_figura")
+                    exibir_grafico_renomeavel(x_axis, y_axis, color_col, tipo_grafico)
 
 
     except Exception as e:
         st.error(f"Erro ao processar o arquivo: {e}")
+    finally:
+        exibir_diagnostico(medidor)
 
 st.logo("https://static.tildacdn.net/tild6338-3232-4634-b733-666338333564/giphy.gif", size="large")
 
@@ -438,8 +553,9 @@ with st.sidebar.expander(":green[**CARREGAR**] ARQUIVO", expanded=st.session_sta
     uploaded_file = st.file_uploader("📊 :green[**Carregue um arquivo para criar um gráfico**]", type=["xlsx", "csv"])
     if uploaded_file:
         st.session_state["expand_file_uploader"] = False  # Fecha o expander após upload
+    area_progresso = st.container()  # Barra de progresso da carga em segundo plano
 
 if uploaded_file:
-    exibir_grafico(uploaded_file)
+    exibir_grafico(uploaded_file, area_progresso)
 else:
     exibir_grafico()
@@ -0,0 +1,194 @@
+# inferencia.py
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from duracao import PADRAO_DURACAO
+
+# Quantidade de valores analisados por coluna para decidir o tipo
+TAMANHO_AMOSTRA = 1000
+
+# Padrões reconhecidos na amostra (aplicados sobre o texto sem espaços nas pontas)
+PADRAO_INTEIRO = r"^[-+]?\d+$"
+PADRAO_NUMERO = r"^[-+]?(\d+\.?\d*|\.\d+)([eE][-+]?\d+)?$"
+PADRAO_DECIMAL_BR = r"^[-+]?(\d{1,3}(\.\d{3})+|\d+)(,\d+)?$"
+PADRAO_MILHAR_BR = r"^[-+]?\d{1,3}(\.\d{3})+$"
+PADRAO_MOEDA = r"^-?\s*R\$\s*-?\s*(\d{1,3}(\.\d{3})+|\d+)(,\d+)?$"
+PADRAO_DATA_BR = r"^\d{1,2}/\d{1,2}/\d{4}( \d{1,2}:\d{2}(:\d{2})?)?$"
+PADRAO_DATA_ISO = r"^\d{4}-\d{2}-\d{2}([ T]\d{2}:\d{2}(:\d{2}(\.\d+)?)?)?$"
+
+# Valores aceitos como booleanos (comparados em minúsculas)
+VERDADEIROS = ["true", "verdadeiro", "sim", "s"]
+FALSOS = ["false", "falso", "não", "nao", "n"]
+
+# Proporção mínima da amostra para considerar uma coluna como duração (que continua em texto)
+PROPORCAO_DURACAO = 0.9
+
+
+def _todos(mascara):
+    return bool(pc.all(mascara).as_py()) if len(mascara) else False
+
+
+def _texto_limpo(coluna):
+    """
+    Remove espaços das pontas e transforma células vazias em nulos.
+    """
+    texto = pc.utf8_trim_whitespace(pc.cast(coluna, pa.string()))
+    return pc.if_else(pc.equal(texto, ""), pa.scalar(None, pa.string()), texto)
+
+
+def _ordem_data_br(amostra):
+    """
+    Decide entre dd/mm/aaaa (padrão brasileiro) e mm/dd/aaaa, olhando quem passa de 12.
+    """
+    partes = pc.split_pattern(amostra, "/")
+    primeiro = pc.cast(pc.list_element(partes, 0), pa.int32())
+    segundo = pc.cast(pc.list_element(partes, 1), pa.int32())
+    if pc.any(pc.greater(segundo, 12)).as_py() and not pc.any(pc.greater(primeiro, 12)).as_py():
+        return "data_us"
+    return "data"
+
+
+def inferir_tipo(amostra):
+    """
+    Decide o tipo de uma coluna a partir de uma amostra dos seus valores em texto.
+
+    Parâmetros:
+    - amostra (pa.Array): Valores de texto da coluna (nulos são ignorados).
+
+    Retorno:
+    - str: Um de 'inteiro', 'numero', 'decimal_br', 'moeda', 'data', 'data_us', 'data_iso',
+      'booleano', 'duracao', 'numero_ambiguo' (números que podem ter ponto de milhar ou decimal;
+      mantidos como texto) ou 'texto'.
+    """
+    amostra = pc.drop_null(_texto_limpo(amostra))
+    if len(amostra) == 0:
+        return "texto"
+
+    if _todos(pc.match_substring_regex(amostra, PADRAO_INTEIRO)):
+        return "inteiro"
+    # "1.200" ao lado de "980" é milhar no padrão brasileiro, e não 1,2; se a amostra também tiver
+    # decimais com ponto ("3.5"), não há como saber o que "1.250" significa: a coluna fica em texto
+    milhares = pc.match_substring_regex(amostra, PADRAO_MILHAR_BR)
+    if pc.any(milhares).as_py():
+        if _todos(pc.or_(milhares, pc.match_substring_regex(amostra, PADRAO_INTEIRO))):
+            return "decimal_br"
+        if _todos(pc.match_substring_regex(amostra, PADRAO_NUMERO)):
+            return "numero_ambiguo"
+    if _todos(pc.match_substring_regex(amostra, PADRAO_NUMERO)):
+        return "numero"
+    if _todos(pc.match_substring_regex(amostra, PADRAO_MOEDA)):
+        return "moeda"
+    if _todos(pc.match_substring_regex(amostra, PADRAO_DECIMAL_BR)):
+        return "decimal_br"
+    if _todos(pc.match_substring_regex(amostra, PADRAO_DATA_BR)):
+        return _ordem_data_br(amostra)
+    if _todos(pc.match_substring_regex(amostra, PADRAO_DATA_ISO)):
+        return "data_iso"
+    if _todos(pc.is_in(pc.utf8_lower(amostra), value_set=pa.array(VERDADEIROS + FALSOS))):
+        return "booleano"
+
+    duracoes = pc.sum(pc.match_substring_regex(amostra, PADRAO_DURACAO)).as_py() or 0
+    if duracoes >= PROPORCAO_DURACAO * len(amostra):
+        return "duracao"
+    return "texto"
+
+
+def _converter_datas(texto, formatos):
+    """
+    Converte texto para datas testando cada formato e ficando com o primeiro que funcionar por célula.
+    """
+    convertidas = [pc.strptime(texto, format=formato, unit="ns", error_is_null=True) for formato in formatos]
+    return pc.coalesce(*convertidas)
+
+
+def converter_coluna(coluna, tipo):
+    """
+    Converte uma coluna de texto inteira para o tipo inferido, em uma única passada vetorizada.
+
+    Parâmetros:
+    - coluna (pa.Array): Valores em texto.
+    - tipo (str): Tipo devolvido por inferir_tipo.
+
+    Retorno:
+    - convertida (Series): Coluna convertida (texto e duração continuam como texto).
+    - falhas (int): Quantidade de células preenchidas que não couberam no tipo.
+    """
+    texto = _texto_limpo(coluna)
+
+    if tipo in ("inteiro", "numero"):
+        valores = pc.if_else(pc.match_substring_regex(texto, PADRAO_NUMERO), texto, None)
+        convertida = pc.cast(valores, pa.float64())
+    elif tipo in ("decimal_br", "moeda"):
+        padrao = PADRAO_MOEDA if tipo == "moeda" else PADRAO_DECIMAL_BR
+        valores = pc.if_else(pc.match_substring_regex(texto, padrao), texto, None)
+        negativos = pc.match_substring(valores, "-")
+        valores = pc.replace_substring_regex(valores, r"[^\d,]", "")
+        valores = pc.replace_substring(valores, ",", ".")
+        convertida = pc.cast(valores, pa.float64())
+        convertida = pc.if_else(negativos, pc.negate(convertida), convertida)
+    elif tipo in ("data", "data_us"):
+        dia_mes = "%d/%m/%Y" if tipo == "data" else "%m/%d/%Y"
+        convertida = _converter_datas(texto, [f"{dia_mes} %H:%M:%S", f"{dia_mes} %H:%M", dia_mes])
+    elif tipo == "data_iso":
+        convertida = _converter_datas(
+            pc.replace_substring(texto, "T", " "),
+            ["%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%d"],
+        )
+        # Frações de segundo não são aceitas pelo strptime do Arrow; nesse caso o pandas resolve
+        if convertida.null_count > texto.null_count:
+            convertida = pa.array(pd.to_datetime(texto.to_pandas(), format="ISO8601", errors="coerce"))
+    elif tipo == "booleano":
+        minusculas = pc.utf8_lower(texto)
+        convertida = pc.if_else(
+            pc.is_in(minusculas, value_set=pa.array(VERDADEIROS + FALSOS)),
+            pc.is_in(minusculas, value_set=pa.array(VERDADEIROS)),
+            None,
+        )
+    else:
+        return pd.Series(texto.to_pandas(), dtype=object), 0
+
+    falhas = convertida.null_count - texto.null_count
+    serie = convertida.to_pandas()
+    if tipo == "inteiro" and convertida.null_count == 0:
+        serie = serie.astype("int64")
+    elif tipo == "booleano":
+        serie = serie.astype("bool") if convertida.null_count == 0 else serie.astype("boolean")
+    return pd.Series(serie), falhas
+
+
+def amostrar(coluna, tamanho=TAMANHO_AMOSTRA):
+    """
+    Retira uma amostra espaçada uniformemente ao longo de toda a coluna (início, meio e fim do arquivo).
+
+    Parâmetros:
+    - coluna (pa.ChunkedArray ou pa.Array): Coluna completa em texto.
+    - tamanho (int): Quantidade máxima de valores. Padrão é TAMANHO_AMOSTRA.
+
+    Retorno:
+    - pa.Array: Valores amostrados.
+    """
+    total = len(coluna)
+    if total <= tamanho:
+        return pa.concat_arrays(coluna.chunks) if isinstance(coluna, pa.ChunkedArray) else coluna
+    indices = np.linspace(0, total - 1, tamanho).astype("int64")
+    amostra = coluna.take(pa.array(indices))
+    return pa.concat_arrays(amostra.chunks) if isinstance(amostra, pa.ChunkedArray) else amostra
+
+
+def inferir_esquema(tabela, tamanho_amostra=TAMANHO_AMOSTRA):
+    """
+    Infere o tipo de todas as colunas de uma tabela Arrow de texto, analisando apenas uma amostra.
+
+    Parâmetros:
+    - tabela (pa.Table): Tabela com as células em texto.
+    - tamanho_amostra (int): Valores analisados por coluna. Padrão é TAMANHO_AMOSTRA.
+
+    Retorno:
+    - dict: Tipo inferido por coluna (ex.: {'Salário': 'moeda', 'Horas Extras': 'duracao'}).
+    """
+    return {
+        nome: inferir_tipo(amostrar(tabela.column(nome), tamanho_amostra))
+        for nome in tabela.column_names
+    }
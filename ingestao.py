@@ -0,0 +1,483 @@
+# ingestao.py
+import csv
+import datetime
+import functools
+import hashlib
+import io
+import itertools
+import json
+import os
+import tempfile
+import threading
+from pathlib import Path
+
+import openpyxl
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from cache import CACHE, limpar_diretorio
+from inferencia import converter_coluna, inferir_esquema
+
+# Diretório onde cada upload é guardado uma única vez em formato Arrow (IPC), identificado pelo conteúdo
+DIRETORIO_CACHE = Path(os.environ.get("GRAFICOS_CACHE_DIR", Path(tempfile.gettempdir()) / "graficos_cache"))
+
+# Espaço em disco (MB) para as tabelas dos uploads; as usadas há mais tempo são apagadas primeiro
+LIMITE_DISCO_MB = int(os.environ.get("GRAFICOS_ARQUIVOS_MB", 10 * 1024))
+
+# Teto de memória (MB) para o DataFrame materializado a partir de um upload
+LIMITE_MEMORIA_MB = int(os.environ.get("GRAFICOS_LIMITE_MEMORIA_MB", 2048))
+
+# Quantidade de linhas lidas, tipadas e medidas por vez
+LINHAS_POR_LOTE = 100_000
+
+# Linhas brutas mostradas enquanto o arquivo ainda está sendo convertido
+LINHAS_PREVIA = 50
+
+# Tabelas já abertas via memory-map neste processo (chave do conteúdo -> pa.Table)
+_tabelas_abertas = {}
+_trava_tabelas = threading.Lock()
+
+# Leitura, inferência e regravação do esquema em JSON acontecem sob esta trava (cargas em segundo plano)
+_trava_esquemas = threading.Lock()
+
+# Nomes das planilhas de cada XLSX já inspecionado (impressão do conteúdo -> lista de nomes)
+_planilhas = {}
+
+
+class LimiteMemoriaExcedido(MemoryError):
+    """Erro levantado quando os dados carregados ultrapassam o teto de memória configurado."""
+
+
+def impressao_conteudo(dados):
+    """
+    Calcula a impressão digital (hash) do conteúdo de um arquivo.
+
+    Parâmetros:
+    - dados (bytes): Conteúdo bruto do arquivo enviado.
+
+    Retorno:
+    - str: Hash hexadecimal usado como chave de cache.
+    """
+    return hashlib.blake2b(dados, digest_size=16).hexdigest()
+
+
+def _caminho_tabela(chave):
+    return DIRETORIO_CACHE / f"{chave}.arrow"
+
+
+def _contar_campos(dados):
+    """
+    Descobre o maior número de campos em uma linha do CSV, lendo o arquivo em fluxo.
+    """
+    texto = io.TextIOWrapper(io.BytesIO(dados), encoding="utf-8", errors="replace", newline="")
+    return max((len(linha) for linha in csv.reader(texto)), default=0)
+
+
+def _lotes_csv(dados, linhas_por_lote, nomes=None):
+    """
+    Lê o CSV em lotes, sem cabeçalho e com todas as células como texto.
+    As linhas a descartar e o cabeçalho são resolvidos depois, na fatia. Linhas em branco são mantidas,
+    para que as linhas a descartar contem as linhas do arquivo como estão (e como aparecem na prévia).
+    """
+    fonte = io.BytesIO(dados)
+    lotes = pd.read_csv(fonte, header=None, dtype=str, names=nomes, chunksize=linhas_por_lote, skip_blank_lines=False)
+    for lote in lotes:
+        yield lote, fonte.tell() / max(len(dados), 1)
+
+
+def listar_planilhas(dados, impressao=None):
+    """
+    Lista as planilhas de um arquivo XLSX, lendo apenas o índice do arquivo (modo somente leitura).
+
+    Parâmetros:
+    - dados (bytes ou memoryview): Conteúdo bruto do arquivo (só é lido se a impressão ainda não for conhecida).
+    - impressao (str): Impressão do conteúdo, se já calculada. Padrão é None.
+
+    Retorno:
+    - list: Nomes das planilhas, na ordem do arquivo.
+    """
+    impressao = impressao or impressao_conteudo(dados)
+    if impressao not in _planilhas:
+        pasta = openpyxl.load_workbook(io.BytesIO(dados), read_only=True)
+        _planilhas[impressao] = list(pasta.sheetnames)
+        pasta.close()
+    return _planilhas[impressao]
+
+
+def _texto_celula(valor):
+    """
+    Converte o valor de uma célula do openpyxl para texto, no mesmo formato usado para o CSV.
+    """
+    if valor is None or isinstance(valor, str):
+        return valor
+    if isinstance(valor, datetime.timedelta):
+        # Células de duração (formato [h]:mm) viram HH:MM:SS, sem limite de 24 horas
+        segundos = int(round(valor.total_seconds()))
+        sinal = "-" if segundos < 0 else ""
+        segundos = abs(segundos)
+        return f"{sinal}{segundos // 3600}:{segundos // 60 % 60:02}:{segundos % 60:02}"
+    if isinstance(valor, datetime.datetime):
+        return valor.isoformat(sep=" ")
+    return str(valor)
+
+
+def _lotes_xlsx(dados, linhas_por_lote, planilha=None):
+    """
+    Lê uma planilha do XLSX em fluxo (openpyxl em modo somente leitura, sem carregar estilos),
+    sem cabeçalho e com todas as células como texto.
+    """
+    pasta = openpyxl.load_workbook(io.BytesIO(dados), read_only=True, data_only=True)
+    try:
+        folha = pasta[planilha] if planilha else pasta.worksheets[0]
+        total_linhas = folha.max_row or 0
+        # Sem a dimensão gravada (max_column None), a largura é a da linha mais larga vista até aqui
+        largura, linhas, lidas = folha.max_column or 0, [], 0
+        for linha in folha.iter_rows(values_only=True):
+            linhas.append([_texto_celula(valor) for valor in linha])
+            if len(linhas) == linhas_por_lote:
+                largura = max(largura, max(len(item) for item in linhas))
+                lidas += len(linhas)
+                yield pd.DataFrame(linhas).reindex(columns=range(largura)), lidas / max(total_linhas, lidas)
+                linhas = []
+        if linhas or not lidas:
+            largura = max(largura, max((len(item) for item in linhas), default=0))
+            yield pd.DataFrame(linhas).reindex(columns=range(largura)), 1.0
+    finally:
+        pasta.close()
+
+
+def _esquema_texto(largura):
+    return pa.schema([(str(i), pa.string()) for i in range(largura)])
+
+
+def _gravar_lotes(lotes, caminho, progresso=None):
+    """
+    Grava os lotes brutos em Arrow IPC sem compressão (permite memory-map), um lote por vez,
+    usando um arquivo temporário para que leitores concorrentes nunca vejam um arquivo incompleto.
+    Um lote mais largo que os anteriores (XLSX sem a dimensão gravada) abre uma nova parte; no final
+    as partes são juntadas, lote a lote, com as colunas que faltavam vazias.
+    """
+    caminho.parent.mkdir(parents=True, exist_ok=True)
+    prefixo = f"{caminho.name}.{os.getpid()}.{threading.get_ident()}"
+    temporario = caminho.with_name(f"{prefixo}.tmp")
+    partes, destino, escritor, esquema = [], None, None, _esquema_texto(0)
+    try:
+        for lote, fracao in lotes:
+            if escritor is None or lote.shape[1] > len(esquema):
+                if escritor is not None:
+                    escritor.close()
+                    destino.close()
+                esquema = _esquema_texto(lote.shape[1])
+                partes.append(caminho.with_name(f"{prefixo}.{len(partes)}.tmp"))
+                destino = pa.OSFile(str(partes[-1]), "wb")
+                escritor = pa.ipc.new_file(destino, esquema)
+            lote.columns = esquema.names
+            escritor.write_table(pa.Table.from_pandas(lote, schema=esquema, preserve_index=False))
+            if progresso:
+                progresso(fracao, "Lendo arquivo")
+        if escritor is not None:
+            escritor.close()
+            destino.close()
+
+        if len(partes) == 1:
+            os.replace(partes[0], temporario)
+        else:
+            with pa.OSFile(str(temporario), "wb") as saida, pa.ipc.new_file(saida, esquema) as juntas:
+                for parte in partes:
+                    with pa.memory_map(str(parte), "r") as fonte:
+                        leitor = pa.ipc.open_file(fonte)
+                        for i in range(leitor.num_record_batches):
+                            lote = leitor.get_batch(i)
+                            vazias = [pa.nulls(lote.num_rows, pa.string())] * (len(esquema) - lote.num_columns)
+                            juntas.write_batch(pa.record_batch(lote.columns + vazias, schema=esquema))
+        os.replace(temporario, caminho)
+    finally:
+        if destino is not None:
+            destino.close()
+        for arquivo in [temporario, *partes]:
+            if arquivo.exists():
+                arquivo.unlink()
+
+
+def ler_previa(nome, dados, linhas=LINHAS_PREVIA, planilha=None, impressao=None):
+    """
+    Lê só as primeiras linhas do arquivo, em texto e sem cabeçalho (como estão no arquivo), para mostrar
+    enquanto a conversão completa acontece e ajudar a escolher as linhas a descartar.
+
+    Parâmetros:
+    - nome (str): Nome do arquivo (.csv ou .xlsx).
+    - dados (bytes ou memoryview): Conteúdo bruto do arquivo.
+    - linhas (int): Quantidade de linhas lidas. Padrão é LINHAS_PREVIA.
+    - planilha (str): Planilha a ler em arquivos XLSX. Padrão é None (a primeira).
+    - impressao (str): Impressão do conteúdo, se já calculada. Padrão é None.
+
+    Retorno:
+    - DataFrame: Primeiras linhas, ou None se o tipo não for suportado.
+    """
+    if nome.endswith(".xlsx"):
+        lotes = _lotes_xlsx(dados, linhas, planilha or listar_planilhas(dados, impressao)[0])
+        try:
+            return next(lotes)[0]
+        finally:
+            lotes.close()
+    if nome.endswith(".csv"):
+        # Leitura direta com o módulo csv: linhas iniciais com menos campos não atrapalham
+        texto = io.TextIOWrapper(io.BytesIO(dados), encoding="utf-8", errors="replace", newline="")
+        return pd.DataFrame(itertools.islice(csv.reader(texto), linhas))
+    return None
+
+
+def chave_tabela(nome, dados, planilha=None, impressao=None):
+    """
+    Calcula a chave da tabela de um upload, a mesma usada por ingerir_arquivo (no XLSX, uma por planilha).
+    Com a impressão já calculada, o conteúdo só é lido para listar as planilhas de um XLSX ainda não visto.
+    """
+    chave = impressao or impressao_conteudo(dados)
+    if nome.endswith(".xlsx"):
+        planilha = planilha or listar_planilhas(dados, chave)[0]
+        chave = f"{chave}-{hashlib.blake2b(planilha.encode(), digest_size=4).hexdigest()}"
+    return chave
+
+
+def tabela_em_disco(chave):
+    """
+    Indica se o upload já foi convertido para Arrow (ingerir_arquivo não precisaria ler o arquivo).
+    """
+    return _caminho_tabela(chave).exists()
+
+
+def ingerir_arquivo(nome, dados, progresso=None, linhas_por_lote=LINHAS_POR_LOTE, planilha=None, impressao=None):
+    """
+    Converte o upload para uma tabela Arrow em disco, apenas na primeira vez que o conteúdo aparece.
+    O arquivo é lido em lotes, de modo que só um lote fica em memória durante a conversão.
+    Em arquivos XLSX cada planilha é convertida e guardada separadamente.
+
+    Parâmetros:
+    - nome (str): Nome do arquivo enviado (define o leitor: .csv ou .xlsx).
+    - dados (bytes ou memoryview): Conteúdo bruto do arquivo (só é lido se a tabela ainda não estiver em disco).
+    - progresso (callable): Função opcional chamada como progresso(fração, mensagem). Padrão é None.
+    - linhas_por_lote (int): Linhas lidas por vez. Padrão é LINHAS_POR_LOTE.
+    - planilha (str): Planilha a ler em arquivos XLSX. Padrão é None (a primeira).
+    - impressao (str): Impressão do conteúdo, se já calculada (evita reler o arquivo). Padrão é None.
+
+    Retorno:
+    - str: Chave do conteúdo, usada para abrir e fatiar a tabela, ou None se o tipo não for suportado.
+    """
+    if not nome.endswith((".csv", ".xlsx")):
+        return None
+
+    chave = chave_tabela(nome, dados, planilha, impressao)
+    caminho = _caminho_tabela(chave)
+    if caminho.exists():
+        os.utime(caminho)  # Marca o uso recente, para a limpeza do diretório
+        return chave
+
+    # Abre espaço para o novo upload apagando as tabelas usadas há mais tempo
+    limpar_diretorio(DIRETORIO_CACHE, LIMITE_DISCO_MB * 1024 ** 2, padroes=("*.arrow", "*.esquema.json"))
+    with _trava_tabelas:
+        for antiga in [antiga for antiga in _tabelas_abertas if not _caminho_tabela(antiga).exists()]:
+            del _tabelas_abertas[antiga]
+
+    if nome.endswith(".xlsx"):
+        _gravar_lotes(_lotes_xlsx(dados, linhas_por_lote, planilha), caminho, progresso)
+        return chave
+
+    try:
+        _gravar_lotes(_lotes_csv(dados, linhas_por_lote), caminho, progresso)
+    except pd.errors.ParserError:
+        # Linhas iniciais com menos campos (títulos, observações) quebram o parser;
+        # nesse caso descobre o maior número de campos e nomeia as colunas explicitamente
+        nomes = list(range(_contar_campos(dados)))
+        _gravar_lotes(_lotes_csv(dados, linhas_por_lote, nomes), caminho, progresso)
+    return chave
+
+
+def abrir_tabela(chave):
+    """
+    Abre a tabela Arrow de um upload via memory-map (sem copiar os dados para a memória).
+
+    Parâmetros:
+    - chave (str): Chave devolvida por ingerir_arquivo.
+
+    Retorno:
+    - pa.Table: Tabela bruta, com todas as linhas do arquivo e células em texto.
+    """
+    with _trava_tabelas:
+        if chave not in _tabelas_abertas:
+            fonte = pa.memory_map(str(_caminho_tabela(chave)), "r")
+            _tabelas_abertas[chave] = pa.ipc.open_file(fonte).read_all()
+        return _tabelas_abertas[chave]
+
+
+def _nomes_colunas(cabecalho):
+    """
+    Gera os nomes das colunas a partir da linha de cabeçalho, seguindo as mesmas regras do pandas
+    (células vazias viram 'Unnamed: N' e nomes repetidos recebem sufixo '.1', '.2', ...).
+    """
+    nomes, vistos = [], {}
+    for i, valor in enumerate(cabecalho):
+        nome = f"Unnamed: {i}" if valor is None or str(valor).strip() == "" else str(valor)
+        if nome in vistos:
+            vistos[nome] += 1
+            nome = f"{nome}.{vistos[nome]}"
+        else:
+            vistos[nome] = 0
+        nomes.append(nome)
+    return nomes
+
+
+def ler_cabecalho(chave, skip_rows=0):
+    """
+    Retorna os nomes das colunas considerando as linhas descartadas, sem materializar os dados.
+    """
+    tabela = abrir_tabela(chave)
+    if skip_rows >= tabela.num_rows:
+        return []
+    return _nomes_colunas(tabela.slice(skip_rows, 1).to_pylist()[0].values())
+
+
+def _caminho_esquema(chave):
+    return DIRETORIO_CACHE / f"{chave}.esquema.json"
+
+
+def obter_esquema(chave, skip_rows=0):
+    """
+    Retorna o tipo inferido de cada coluna, guardado em JSON ao lado da tabela em cache.
+    A inferência (por amostragem) só acontece na primeira vez para cada número de linhas descartadas.
+
+    Parâmetros:
+    - chave (str): Chave devolvida por ingerir_arquivo.
+    - skip_rows (int): Linhas iniciais a descartar.
+
+    Retorno:
+    - dict: Tipo inferido por coluna (ex.: {'Salário': 'moeda', 'Horas Extras': 'duracao'}).
+    """
+    caminho = _caminho_esquema(chave)
+    with _trava_esquemas:
+        esquemas = json.loads(caminho.read_text(encoding="utf-8")) if caminho.exists() else {}
+        if str(skip_rows) not in esquemas:
+            nomes = ler_cabecalho(chave, skip_rows)
+            dados = abrir_tabela(chave).slice(skip_rows + 1).rename_columns(nomes)
+            esquemas[str(skip_rows)] = inferir_esquema(dados)
+            _gravar_esquemas(caminho, esquemas)
+    return esquemas[str(skip_rows)]
+
+
+def _gravar_esquemas(caminho, esquemas):
+    temporario = caminho.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+    temporario.write_text(json.dumps(esquemas, ensure_ascii=False), encoding="utf-8")
+    os.replace(temporario, caminho)
+
+
+def _rebaixar_para_texto(chave, skip_rows, colunas):
+    """
+    Registra no esquema em disco que as colunas devem ser lidas como texto
+    (algum valor fora da amostra não coube no tipo inferido).
+    """
+    caminho = _caminho_esquema(chave)
+    with _trava_esquemas:
+        esquemas = json.loads(caminho.read_text(encoding="utf-8"))
+        esquemas[str(skip_rows)].update({col: "texto" for col in colunas})
+        _gravar_esquemas(caminho, esquemas)
+
+
+def _sem_linhas_vazias(dados):
+    """
+    Remove as linhas de dados totalmente vazias (linhas em branco do arquivo), sem copiar a tabela se não houver nenhuma.
+    """
+    if not dados.num_columns:
+        return dados
+    preenchidas = functools.reduce(pc.or_, [pc.is_valid(coluna) for coluna in dados.columns])
+    return dados if pc.all(preenchidas).as_py() else dados.filter(preenchidas)
+
+
+def fatiar_tabela(chave, skip_rows=0, colunas=None, tipos=None, progresso=None,
+                  limite_memoria_mb=LIMITE_MEMORIA_MB, linhas_por_lote=LINHAS_POR_LOTE):
+    """
+    Monta o DataFrame a partir da tabela em cache: descarta linhas, projeta colunas e aplica tipos.
+    Os tipos vêm do esquema inferido por amostragem e são aplicados lote a lote, controlando o uso de memória.
+
+    Parâmetros:
+    - chave (str): Chave devolvida por ingerir_arquivo.
+    - skip_rows (int): Linhas iniciais a descartar; a linha seguinte é usada como cabeçalho.
+    - colunas (list): Colunas a manter (projeção). Padrão é None (todas).
+    - tipos (dict): Tipos forçados por coluna ({coluna: dtype}). Padrão é None.
+    - progresso (callable): Função opcional chamada como progresso(fração, mensagem). Padrão é None.
+    - limite_memoria_mb (int): Teto de memória para o resultado. Padrão é LIMITE_MEMORIA_MB.
+    - linhas_por_lote (int): Linhas convertidas por vez. Padrão é LINHAS_POR_LOTE.
+
+    Retorno:
+    - df (DataFrame): Dados prontos para uso (números, moeda, datas e booleanos já convertidos).
+    - esquema (dict): Tipo de cada coluna materializada.
+    """
+    tabela = abrir_tabela(chave)
+    if skip_rows >= tabela.num_rows:
+        raise ValueError(f"Linhas a descartar ({skip_rows}) excede o total de linhas do arquivo ({tabela.num_rows}).")
+    nomes = ler_cabecalho(chave, skip_rows)
+    dados = _sem_linhas_vazias(tabela.slice(skip_rows + 1).rename_columns(nomes))
+
+    if colunas is not None:
+        dados = dados.select([col for col in nomes if col in set(colunas)])
+
+    esquema = {col: tipo for col, tipo in obter_esquema(chave, skip_rows).items() if col in dados.column_names}
+    limite_bytes = limite_memoria_mb * 1024 ** 2
+    rebaixadas, partes, usados = set(), [], 0
+    lotes = dados.to_batches(max_chunksize=linhas_por_lote) or [dados.slice(0, 0)]
+    for i, lote in enumerate(lotes):
+        parte = {}
+        for col, coluna in zip(dados.column_names, lote.columns):
+            parte[col], falhas = converter_coluna(coluna, "texto" if col in rebaixadas else esquema[col])
+            if falhas:
+                # Um valor fora da amostra não coube no tipo: a coluna volta a ser texto no final
+                rebaixadas.add(col)
+        parte = pd.DataFrame(parte)
+
+        usados += int(parte.memory_usage(index=False, deep=True).sum())
+        if usados > limite_bytes:
+            raise LimiteMemoriaExcedido(
+                f"O arquivo ultrapassa o limite de memória configurado ({limite_memoria_mb} MB). "
+                "Descarte linhas ou selecione menos colunas."
+            )
+        partes.append(parte)
+        if progresso:
+            progresso((i + 1) / len(lotes), "Convertendo tipos")
+
+    df = pd.concat(partes, ignore_index=True) if len(partes) > 1 else partes[0]
+    if rebaixadas:
+        for col in rebaixadas:
+            df[col], _ = converter_coluna(dados.column(col), "texto")
+            esquema[col] = "texto"
+        _rebaixar_para_texto(chave, skip_rows, rebaixadas)
+    if tipos:
+        df = df.astype({col: tipo for col, tipo in tipos.items() if col in df.columns})
+    return df, esquema
+
+
+def fatia_em_cache(chave, skip_rows=0, colunas=None):
+    """
+    Indica se a fatia já está montada neste processo (carregar_dados não leria a tabela).
+    """
+    return CACHE.contem(("fatia", chave, skip_rows, tuple(colunas) if colunas is not None else None))
+
+
+def carregar_dados(chave, skip_rows=0, progresso=None, colunas=None):
+    """
+    Retorna a fatia tipada e o esquema inferido, reaproveitando o resultado entre reruns e sessões.
+    O DataFrame retornado é compartilhado e deve ser tratado como somente leitura.
+
+    Parâmetros:
+    - chave (str): Chave devolvida por ingerir_arquivo.
+    - skip_rows (int): Linhas iniciais a descartar.
+    - progresso (callable): Função opcional chamada como progresso(fração, mensagem). Padrão é None.
+    - colunas (list): Colunas a materializar (projeção). Padrão é None (todas).
+
+    Retorno:
+    - df (DataFrame): Dados tipados.
+    - esquema (dict): Tipo inferido por coluna (ex.: {'Salário': 'moeda', 'Horas Extras': 'duracao'}).
+    """
+    # Com o disco do cache ligado, a fatia também é gravada lá e serve aos outros processos
+    identificador = ("fatia", chave, skip_rows, tuple(colunas) if colunas is not None else None)
+    return CACHE.obter_ou_calcular(
+        identificador, lambda: fatiar_tabela(chave, skip_rows, colunas=colunas, progresso=progresso), persistir=True
+    )
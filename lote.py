@@ -0,0 +1,260 @@
+# lote.py
+# Renderização de gráficos em lote, sem Streamlit: aplica a cada arquivo a mesma sequência do aplicativo
+# (carregar → filtrar → ordenar → texto → minutos → agrupar → ticks → figura) e grava o HTML e o JSON da figura.
+# Uso: python lote.py espec.toml dados/*.xlsx --saida graficos/ --processos 8
+import argparse
+import json
+import os
+import sys
+import time
+import tomllib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import pandas as pd
+
+from agregacao import COLUNA_REGISTROS, agregar
+from eixos import estatisticas_eixo, gerar_ticks
+from figura import MAXIMO_CAMPOS_HOVER, LIMITE_TEXTO_BARRAS, aplicar_rotulos, construir_figura, limitar_campos_hover
+from ingestao import fatiar_tabela, ingerir_arquivo, ler_cabecalho
+from pipeline import adicionar_minutos, adicionar_texto_barras, filtrar, materializar, ordenar, reordenar_colunas
+
+# Especificação usada quando a chave não aparece no arquivo (os mesmos padrões da barra lateral)
+ESPEC_PADRAO = {
+    "planilha": None,        # Planilha dos arquivos XLSX (None = a primeira)
+    "skip_rows": 0,          # Linhas iniciais a descartar
+    "colunas": None,         # Colunas a carregar (None = todas)
+    "primeira_coluna": None,
+    "filtros": [],           # Regras de filtros.linhas_filtradas
+    "ordenar": None,         # {'coluna', 'crescente'}
+    "texto": [],             # Colunas do texto nas barras
+    "maximo_caracteres": 0,
+    "tipo": "barras",        # 'barras', 'linhas' ou 'dispersao'
+    "x": None,               # Obrigatório
+    "y": None,               # Obrigatório
+    "cor": None,             # None = o próprio eixo X
+    "hover": None,           # None = as primeiras MAXIMO_CAMPOS_HOVER colunas
+    "agrupar": None,         # {'funcao': 'sum', 'top_n': 0}
+    "rotulos": {},           # {'x', 'y', 'legenda', 'titulo'}
+}
+
+# Título padrão do gráfico (o mesmo do aplicativo)
+TITULO_PADRAO = "📊 Estatísticas"
+
+
+def ler_especificacao(caminho):
+    """
+    Lê a especificação do gráfico de um arquivo .json ou .toml e completa as chaves ausentes.
+
+    Parâmetros:
+    - caminho (str | Path): Arquivo da especificação.
+
+    Retorno:
+    - dict: Especificação completa (veja ESPEC_PADRAO).
+    """
+    caminho = Path(caminho)
+    if caminho.suffix == ".toml":
+        with open(caminho, "rb") as arquivo:
+            espec = tomllib.load(arquivo)
+    elif caminho.suffix == ".json":
+        espec = json.loads(caminho.read_text(encoding="utf-8"))
+    else:
+        raise ValueError(f"Formato de especificação não suportado: '{caminho.suffix}' (use .json ou .toml).")
+    return validar_especificacao(espec)
+
+
+def validar_especificacao(espec):
+    """
+    Completa a especificação com os padrões e confere as chaves obrigatórias e desconhecidas.
+    """
+    desconhecidas = set(espec) - set(ESPEC_PADRAO)
+    if desconhecidas:
+        raise ValueError(f"Chaves desconhecidas na especificação: {', '.join(sorted(desconhecidas))}")
+    espec = {**ESPEC_PADRAO, **espec}
+    if not espec["x"] or not espec["y"]:
+        raise ValueError("A especificação precisa das chaves 'x' e 'y'.")
+    if espec["tipo"] not in ("barras", "linhas", "dispersao"):
+        raise ValueError(f"Tipo de gráfico desconhecido: {espec['tipo']}")
+    return espec
+
+
+def montar_grafico(nome, dados, espec):
+    """
+    Monta a figura de um arquivo, com as mesmas etapas e padrões do aplicativo.
+
+    Parâmetros:
+    - nome (str): Nome do arquivo (define o leitor: .csv ou .xlsx).
+    - dados (bytes): Conteúdo bruto do arquivo.
+    - espec (dict): Especificação completa (veja validar_especificacao).
+
+    Retorno:
+    - fig (go.Figure): Figura com os rótulos aplicados.
+    - df (DataFrame): Dados do gráfico (após filtros e agrupamento).
+    """
+    chave = ingerir_arquivo(nome, dados, planilha=espec["planilha"])
+    if chave is None:
+        raise ValueError(f"Tipo de arquivo não suportado: {nome}")
+
+    colunas_arquivo = ler_cabecalho(chave, espec["skip_rows"])
+    colunas = [col for col in espec["colunas"] or [] if col in colunas_arquivo] or None
+    # Cada processo monta muitos arquivos diferentes: a fatia não vai para o cache em memória
+    df, esquema = fatiar_tabela(chave, espec["skip_rows"], colunas=colunas)
+    if df.empty:
+        raise ValueError(f"O arquivo '{nome}' não tem dados.")
+
+    x, y, cor = espec["x"], espec["y"], espec["cor"] or espec["x"]
+    for coluna in {x, y, cor}:
+        if coluna not in df.columns:
+            raise ValueError(f"A coluna '{coluna}' não foi encontrada no arquivo '{nome}'.")
+
+    if espec["primeira_coluna"]:
+        df = reordenar_colunas(df, espec["primeira_coluna"])
+    selecao = filtrar(df, espec["filtros"], esquema)
+    if espec["ordenar"]:
+        coluna = espec["ordenar"]["coluna"]
+        selecao = ordenar(selecao, coluna, espec["ordenar"].get("crescente", True), esquema.get(coluna))
+    df = materializar(selecao, colunas)
+
+    texto = None
+    if espec["texto"] and len(df) <= LIMITE_TEXTO_BARRAS:
+        df = adicionar_texto_barras(df, espec["texto"], espec["maximo_caracteres"], nome="Texto Barras")
+        texto = "Texto Barras"
+
+    hover = espec["hover"] if espec["hover"] is not None else list(df.columns[:MAXIMO_CAMPOS_HOVER])
+
+    # Durações (HH:MM) no eixo Y são convertidas para minutos
+    tipo_y = esquema.get(y)
+    if tipo_y == "duracao":
+        df, _ = adicionar_minutos(df, y, nome=f"{y} Minutos")
+        y = f"{y} Minutos"
+
+    if espec["agrupar"]:
+        funcao = espec["agrupar"].get("funcao", "sum")
+        if funcao != "count" and not pd.api.types.is_numeric_dtype(df[y]):
+            funcao = "count"
+        df = agregar(df, x, y, cor=cor, funcao=funcao, top_n=espec["agrupar"].get("top_n", 0))
+        if y not in df.columns:
+            y = COLUNA_REGISTROS
+        if funcao == "count" or y == COLUNA_REGISTROS:
+            tipo_y = None  # Contagens são números simples, não durações ou datas
+        hover = list(df.columns)
+        texto = None
+
+    hover = limitar_campos_hover(df, [col for col in hover if col in df.columns])
+    tick_vals, tick_texts = gerar_ticks(estatisticas_eixo(df, y, tipo_y), passo_minimo=5)
+
+    fig = construir_figura(df, {
+        "x": x,
+        "y": y,
+        "cor": cor,
+        "texto": texto,
+        "hover": hover,
+        "tick_vals": list(tick_vals),
+        "tick_texts": list(tick_texts),
+        "tipo": espec["tipo"],
+    })
+    rotulos = {"x": x, "y": y, "legenda": cor, "titulo": TITULO_PADRAO, **espec["rotulos"]}
+    return aplicar_rotulos(fig, rotulos), df
+
+
+def renderizar_arquivo(caminho, espec, destino, plotlyjs=True):
+    """
+    Monta o gráfico de um arquivo e grava <nome>.html e <nome>.json no destino.
+    Pensada para rodar em um processo do pool (argumentos e retorno serializáveis).
+
+    Parâmetros:
+    - caminho (str): Arquivo de dados (.csv ou .xlsx).
+    - espec (dict): Especificação completa.
+    - destino (str): Diretório de saída.
+    - plotlyjs (bool | str): True embute o plotly.js no HTML; 'cdn' apenas o referencia. Padrão é True.
+
+    Retorno:
+    - dict: {'arquivo', 'html', 'json', 'linhas', 'segundos', 'erro'}.
+    """
+    inicio = time.perf_counter()
+    resultado = {"arquivo": str(caminho), "html": None, "json": None, "linhas": None, "erro": None}
+    try:
+        caminho = Path(caminho)
+        fig, df = montar_grafico(caminho.name, caminho.read_bytes(), espec)
+        base = Path(destino) / caminho.stem
+        fig.write_html(f"{base}.html", include_plotlyjs=plotlyjs, full_html=True)
+        Path(f"{base}.json").write_text(fig.to_json(), encoding="utf-8")
+        resultado.update(html=f"{base}.html", json=f"{base}.json", linhas=len(df))
+    except Exception as e:
+        resultado["erro"] = f"{type(e).__name__}: {e}"
+    resultado["segundos"] = round(time.perf_counter() - inicio, 3)
+    return resultado
+
+
+def renderizar_lote(arquivos, espec, destino, processos=None, plotlyjs=True, ao_concluir=None):
+    """
+    Renderiza vários arquivos em paralelo, um por processo de cada vez. Falhas em um arquivo
+    não interrompem os demais: ficam registradas no resultado dele.
+
+    Parâmetros:
+    - arquivos (list): Arquivos de dados.
+    - espec (dict): Especificação completa.
+    - destino (str | Path): Diretório de saída (criado se necessário).
+    - processos (int): Quantidade de processos. Padrão é None (um por CPU).
+    - plotlyjs (bool | str): Como incluir o plotly.js no HTML (veja renderizar_arquivo). Padrão é True.
+    - ao_concluir (callable): Função opcional chamada com o resultado de cada arquivo. Padrão é None.
+
+    Retorno:
+    - list: Resultados na ordem dos arquivos (veja renderizar_arquivo).
+    """
+    Path(destino).mkdir(parents=True, exist_ok=True)
+    nomes = [Path(arquivo).stem for arquivo in arquivos]
+    repetidos = sorted({nome for nome in nomes if nomes.count(nome) > 1})
+    if repetidos:
+        raise ValueError(f"Arquivos com o mesmo nome gravariam a mesma saída: {', '.join(repetidos)}")
+
+    resultados = [None] * len(arquivos)
+    if processos == 1:
+        for i, arquivo in enumerate(arquivos):
+            resultados[i] = renderizar_arquivo(str(arquivo), espec, str(destino), plotlyjs)
+            if ao_concluir:
+                ao_concluir(resultados[i])
+        return resultados
+
+    with ProcessPoolExecutor(max_workers=processos) as pool:
+        tarefas = {
+            pool.submit(renderizar_arquivo, str(arquivo), espec, str(destino), plotlyjs): i
+            for i, arquivo in enumerate(arquivos)
+        }
+        for tarefa in as_completed(tarefas):
+            resultados[tarefas[tarefa]] = tarefa.result()
+            if ao_concluir:
+                ao_concluir(resultados[tarefas[tarefa]])
+    return resultados
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gera gráficos em HTML e JSON a partir de uma especificação, sem o Streamlit.")
+    parser.add_argument("especificacao", help="Especificação do gráfico (.json ou .toml)")
+    parser.add_argument("arquivos", nargs="+", help="Arquivos de dados (.csv ou .xlsx)")
+    parser.add_argument("--saida", default="graficos", help="Diretório de saída (padrão: graficos)")
+    parser.add_argument("--processos", type=int, default=None, help="Processos em paralelo (padrão: um por CPU)")
+    parser.add_argument("--cdn", action="store_true", help="Referencia o plotly.js pela CDN em vez de embuti-lo em cada HTML")
+    parser.add_argument("--relatorio", help="Grava os resultados de cada arquivo neste JSON")
+    args = parser.parse_args(argv)
+
+    espec = ler_especificacao(args.especificacao)
+
+    def ao_concluir(resultado):
+        situacao = f"erro: {resultado['erro']}" if resultado["erro"] else f"{resultado['linhas']} linha(s)"
+        print(f"{resultado['arquivo']}: {situacao} ({resultado['segundos']:.1f} s)", file=sys.stderr)
+
+    resultados = renderizar_lote(
+        args.arquivos, espec, args.saida, processos=args.processos or os.cpu_count(),
+        plotlyjs="cdn" if args.cdn else True, ao_concluir=ao_concluir,
+    )
+    if args.relatorio:
+        Path(args.relatorio).write_text(json.dumps(resultados, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    falhas = sum(1 for resultado in resultados if resultado["erro"])
+    print(f"{len(resultados) - falhas} gráfico(s) gerado(s), {falhas} falha(s).", file=sys.stderr)
+    return 1 if falhas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
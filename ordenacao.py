@@ -0,0 +1,99 @@
+# ordenacao.py
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from cache import CACHE
+from duracao import converter_duracao_para_minutos
+
+
+def calcular_permutacao(serie, tipo=None):
+    """
+    Calcula a ordem crescente de uma coluna, com os vazios no final.
+    Durações são comparadas em minutos, datas pelo instante e textos sem diferenciar maiúsculas.
+
+    Parâmetros:
+    - serie (Series): Coluna a ordenar.
+    - tipo (str): Tipo inferido da coluna no esquema (ex.: 'duracao'). Padrão é None.
+
+    Retorno:
+    - permutacao (ndarray): Posições (iloc) das linhas em ordem crescente (int64).
+    - validos (int): Quantidade de linhas não vazias (as primeiras da permutação).
+    """
+    if tipo == "duracao":
+        minutos, _ = converter_duracao_para_minutos(serie)
+        valores = minutos.to_numpy(dtype="float64", na_value=np.nan)
+    elif pd.api.types.is_datetime64_any_dtype(serie):
+        datas = serie.to_numpy(dtype="datetime64[ns]")
+        valores = np.where(np.isnat(datas), np.nan, datas.astype("int64").astype("float64"))
+    elif pd.api.types.is_numeric_dtype(serie):
+        valores = serie.to_numpy(dtype="float64", na_value=np.nan)
+    else:
+        # Texto: ordenação estável do Arrow sobre a versão em minúsculas, com nulos no final
+        texto = pc.utf8_lower(pc.cast(pa.array(serie.astype("string[pyarrow]")), pa.string()))
+        permutacao = pc.array_sort_indices(texto, null_placement="at_end").to_numpy().astype("int64")
+        return permutacao, len(texto) - texto.null_count
+
+    # np.argsort coloca os NaN no final
+    permutacao = np.argsort(valores, kind="stable")
+    return permutacao, int(np.count_nonzero(~np.isnan(valores)))
+
+
+def permutacao_em_cache(serie, tipo=None, impressao=None):
+    """
+    Retorna a permutação crescente da coluna, calculando-a apenas uma vez por conjunto de dados.
+
+    Parâmetros:
+    - serie (Series): Coluna a ordenar (o nome da Series faz parte da chave).
+    - tipo (str): Tipo inferido da coluna no esquema. Padrão é None.
+    - impressao (str): Identificador do conjunto de dados. Padrão é None (não usa o cache).
+
+    Retorno:
+    - tuple: (permutacao, validos), como em calcular_permutacao.
+    """
+    if impressao is None:
+        return calcular_permutacao(serie, tipo)
+
+    # Permutações ficam no cache compartilhado: (impressão do conjunto de dados, coluna, tipo) -> (permutação, válidos)
+    return CACHE.obter_ou_calcular(("permutacao", impressao, serie.name, tipo), lambda: calcular_permutacao(serie, tipo))
+
+
+def ordem_linhas(serie, ascending=True, tipo=None, impressao=None):
+    """
+    Retorna as posições das linhas na ordem pedida. A ordem decrescente é a crescente invertida,
+    mantendo os vazios no final.
+
+    Parâmetros:
+    - serie (Series): Coluna a ordenar.
+    - ascending (bool): Ordem crescente. Padrão é True.
+    - tipo (str): Tipo inferido da coluna no esquema. Padrão é None.
+    - impressao (str): Identificador do conjunto de dados, para reaproveitar a permutação. Padrão é None.
+
+    Retorno:
+    - ndarray: Posições (iloc) das linhas.
+    """
+    permutacao, validos = permutacao_em_cache(serie, tipo, impressao)
+    if ascending:
+        return permutacao
+    return np.concatenate([permutacao[:validos][::-1], permutacao[validos:]])
+
+
+def ordenar_linhas(df, linhas, coluna, ascending=True, tipo=None, impressao=None):
+    """
+    Ordena uma seleção de linhas sem copiar o DataFrame: só as posições são reordenadas.
+
+    Parâmetros:
+    - df (DataFrame): Dados base.
+    - linhas (ndarray): Posições (iloc) selecionadas, ou None para todas.
+    - coluna (str): Coluna usada na ordenação.
+    - ascending (bool): Ordem crescente. Padrão é True.
+    - tipo (str): Tipo inferido da coluna no esquema. Padrão é None.
+    - impressao (str): Identificador da seleção, para reaproveitar a permutação. Padrão é None.
+
+    Retorno:
+    - ndarray: Posições (iloc) em df, na ordem pedida.
+    """
+    serie = df[coluna] if linhas is None else df[coluna].iloc[linhas]
+    ordem = ordem_linhas(serie, ascending, tipo, impressao)
+    return ordem if linhas is None else linhas[ordem]
@@ -0,0 +1,132 @@
+# pipeline.py
+import hashlib
+import json
+
+import pandas as pd
+
+from cache import CACHE
+from duracao import converter_duracao_para_minutos
+from figura import montar_texto_barras
+from filtros import linhas_filtradas
+from ordenacao import ordenar_linhas
+
+
+def impressao_etapa(impressao, nome, parametros=None):
+    """
+    Calcula a impressão da saída de uma etapa a partir da impressão da entrada, do nome da etapa
+    e dos seus parâmetros, sem olhar os dados (o custo não depende do tamanho do arquivo).
+
+    Parâmetros:
+    - impressao (str): Impressão da entrada.
+    - nome (str): Nome da etapa.
+    - parametros (dict): Parâmetros da etapa (serializáveis em JSON). Padrão é None.
+
+    Retorno:
+    - str: Impressão hexadecimal da saída.
+    """
+    texto = json.dumps([impressao, nome, parametros or {}], sort_keys=True, default=str)
+    return hashlib.blake2b(texto.encode(), digest_size=16).hexdigest()
+
+
+def etapa_em_cache(chave):
+    """
+    Indica se a saída com essa impressão já está guardada (a etapa não seria executada).
+    """
+    return CACHE.contem(("etapa", chave))
+
+
+def executar_etapa(nome, funcao, entrada, impressao, /, **parametros):
+    """
+    Executa uma etapa do pipeline apenas se a mesma entrada com os mesmos parâmetros ainda não
+    tiver sido vista; caso contrário devolve o resultado guardado. Mudar um parâmetro refaz só
+    essa etapa e as seguintes, cujas entradas passam a ter outra impressão.
+
+    Parâmetros:
+    - nome (str): Nome da etapa (faz parte da chave).
+    - funcao (callable): Chamada como funcao(entrada, **parametros). Não deve alterar a entrada.
+    - entrada: Resultado da etapa anterior (normalmente um DataFrame).
+    - impressao (str): Impressão da entrada.
+    - parametros: Parâmetros da etapa, repassados para a função e usados na chave.
+
+    Retorno:
+    - resultado: Saída da função (compartilhada entre reruns; deve ser tratada como somente leitura).
+    - impressao (str): Impressão da saída, para encadear a próxima etapa.
+    """
+    chave = impressao_etapa(impressao, nome, parametros)
+    # Partes da entrada repassadas sem cópia (ex.: o df de uma seleção) já contam no tamanho da etapa anterior
+    compartilhados = (entrada, *entrada) if isinstance(entrada, tuple) else (entrada,)
+    resultado = CACHE.obter_ou_calcular(
+        ("etapa", chave), lambda: funcao(entrada, **parametros), excluir=compartilhados
+    )
+    return resultado, chave
+
+
+def reordenar_colunas(df, primeira):
+    """
+    Move a coluna escolhida para a primeira posição (sem cópia se ela já for a primeira).
+    """
+    if df.columns[0] == primeira:
+        return df
+    return df[[primeira] + [col for col in df.columns if col != primeira]]
+
+
+def filtrar(df, regras, esquema=None):
+    """
+    Aplica as regras de filtro como uma seleção de linhas sobre os dados base (veja linhas_filtradas).
+
+    Retorno:
+    - tuple: (df, linhas), com as posições mantidas (None = todas). Os dados não são copiados.
+    """
+    return df, linhas_filtradas(df, regras, esquema)
+
+
+def ordenar(selecao, coluna, ascending=True, tipo=None, impressao=None):
+    """
+    Reordena as posições de uma seleção (df, linhas) pela coluna escolhida (veja ordenar_linhas).
+    """
+    df, linhas = selecao
+    return df, ordenar_linhas(df, linhas, coluna, ascending, tipo, impressao)
+
+
+def materializar(selecao, colunas=None):
+    """
+    Monta o DataFrame da seleção (df, linhas) com as colunas escolhidas, em uma única cópia.
+    O índice guarda a posição de cada linha nos dados carregados, que identifica a linha
+    mesmo quando o filtro ou a ordenação mudam (usado no registro de edições).
+
+    Parâmetros:
+    - selecao (tuple): (df, linhas), com linhas None para todas.
+    - colunas (list): Colunas mantidas, se existirem nos dados. Padrão é None (todas).
+
+    Retorno:
+    - DataFrame: Dados selecionados.
+    """
+    df, linhas = selecao
+    colunas = [col for col in colunas if col in df.columns] if colunas else list(df.columns)
+    resultado = df.iloc[slice(None) if linhas is None else linhas, df.columns.get_indexer(colunas)]
+    resultado.index = pd.RangeIndex(len(df)) if linhas is None else pd.Index(linhas)
+    return resultado
+
+
+def adicionar_texto_barras(df, colunas, maximo_caracteres=0, nome="Texto Barras"):
+    """
+    Retorna uma cópia dos dados com a coluna de texto das barras (veja montar_texto_barras).
+    """
+    return df.assign(**{nome: montar_texto_barras(df, colunas, maximo_caracteres=maximo_caracteres)})
+
+
+def adicionar_minutos(df, coluna, nome=None):
+    """
+    Retorna uma cópia dos dados com a coluna de duração convertida para minutos.
+
+    Parâmetros:
+    - df (DataFrame): Dados.
+    - coluna (str): Coluna de duração (HH:MM).
+    - nome (str): Nome da nova coluna. Padrão é '<coluna> Minutos'.
+
+    Retorno:
+    - df (DataFrame): Dados com a nova coluna.
+    - erros (dict): Valores fora do formato, como em converter_duracao_para_minutos.
+    """
+    minutos, erros = converter_duracao_para_minutos(df[coluna])
+    return df.assign(**{nome or f"{coluna} Minutos": minutos}), erros
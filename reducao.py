@@ -0,0 +1,133 @@
+# reducao.py
+import numpy as np
+import pandas as pd
+
+# Pontos mantidos por linha do gráfico (cerca de dois por pixel em uma tela comum)
+ORCAMENTO_PONTOS = 2000
+
+# Pontos mantidos somando todas as linhas (com muitas séries, cada uma recebe uma parte)
+ORCAMENTO_TOTAL = 50_000
+
+
+def lttb(x, y, limite):
+    """
+    Reduz uma série ordenada pelo algoritmo Largest-Triangle-Three-Buckets (LTTB),
+    preservando picos, vales e o formato geral da linha.
+
+    Parâmetros:
+    - x (ndarray): Valores do eixo X em ordem crescente (numéricos).
+    - y (ndarray): Valores do eixo Y (numéricos, sem nulos).
+    - limite (int): Quantidade máxima de pontos mantidos.
+
+    Retorno:
+    - ndarray: Posições (int64) dos pontos escolhidos, em ordem crescente.
+    """
+    total = len(x)
+    if limite >= total or limite < 3:
+        return np.arange(total)
+
+    # O primeiro e o último ponto sempre ficam; o restante é dividido em limite - 2 baldes
+    bordas = np.linspace(1, total - 1, limite - 1).astype("int64")
+    indices = np.empty(limite, dtype="int64")
+    indices[0], indices[-1] = 0, total - 1
+
+    anterior = 0
+    for i in range(limite - 2):
+        inicio, fim = bordas[i], bordas[i + 1]
+        proximo_fim = bordas[i + 2] if i + 2 < len(bordas) else total
+        media_x = x[fim:proximo_fim].mean()
+        media_y = y[fim:proximo_fim].mean()
+
+        # Fica o ponto do balde que forma o maior triângulo com o anterior escolhido e a média do próximo
+        area = np.abs(
+            (x[anterior] - media_x) * (y[inicio:fim] - y[anterior])
+            - (x[anterior] - x[inicio:fim]) * (media_y - y[anterior])
+        )
+        anterior = inicio + int(np.argmax(area))
+        indices[i + 1] = anterior
+    return indices
+
+
+def eixo_continuo(serie):
+    """
+    Indica se a coluna pode ser tratada como eixo contínuo (números ou datas).
+    """
+    return pd.api.types.is_numeric_dtype(serie) or pd.api.types.is_datetime64_any_dtype(serie)
+
+
+def _valores_eixo(serie):
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        datas = serie.to_numpy(dtype="datetime64[ns]")
+        return np.where(np.isnat(datas), np.nan, datas.astype("int64").astype("float64"))
+    return serie.to_numpy(dtype="float64", na_value=np.nan)
+
+
+def converter_janela(serie, janela):
+    """
+    Converte os limites de uma seleção do gráfico (textos de data ou números) para o tipo da coluna do eixo X.
+
+    Parâmetros:
+    - serie (Series): Coluna do eixo X.
+    - janela (list): [início, fim] vindos da seleção por caixa.
+
+    Retorno:
+    - tuple: (início, fim) em ordem crescente, ou None se a janela não se aplicar à coluna.
+    """
+    if not janela or not eixo_continuo(serie):
+        return None
+    try:
+        if pd.api.types.is_datetime64_any_dtype(serie):
+            inicio, fim = pd.to_datetime(janela[0]), pd.to_datetime(janela[1])
+        else:
+            inicio, fim = float(janela[0]), float(janela[1])
+    except (TypeError, ValueError):
+        return None
+    return (inicio, fim) if inicio <= fim else (fim, inicio)
+
+
+def reduzir_serie(df, x, y, grupo=None, limite=ORCAMENTO_PONTOS, janela=None, orcamento_total=ORCAMENTO_TOTAL):
+    """
+    Escolhe as linhas que serão desenhadas em um gráfico de linhas: ordena pelo eixo X,
+    recorta a janela de zoom (se houver) e reduz cada série ao orçamento de pontos com LTTB.
+    Dentro de uma janela pequena o recorte já cabe no orçamento, e a resolução completa volta.
+
+    Parâmetros:
+    - df (DataFrame): Dados do gráfico.
+    - x, y (str): Colunas dos eixos. Se Y não for numérica, nenhuma série é reduzida.
+    - grupo (str): Coluna que separa as séries (uma linha por categoria). Padrão é None.
+    - limite (int): Pontos mantidos por série, ou None para não reduzir. Padrão é ORCAMENTO_PONTOS.
+    - janela (tuple): (início, fim) no tipo da coluna X, veja converter_janela. Padrão é None.
+    - orcamento_total (int): Pontos mantidos somando todas as séries. Padrão é ORCAMENTO_TOTAL.
+
+    Retorno:
+    - list[ndarray]: Posições (iloc) das linhas escolhidas, uma lista por série, ordenadas por X.
+    """
+    continuo = eixo_continuo(df[x])
+    numerico = pd.api.types.is_numeric_dtype(df[y]) and not pd.api.types.is_bool_dtype(df[y])
+    valores_x = _valores_eixo(df[x]) if continuo else np.arange(len(df), dtype="float64")
+    valores_y = df[y].to_numpy(dtype="float64", na_value=np.nan) if numerico else np.zeros(len(df))
+
+    mascara = np.isfinite(valores_x) & np.isfinite(valores_y)
+    if janela is not None and continuo:
+        if pd.api.types.is_datetime64_any_dtype(df[x]):
+            inicio, fim = float(pd.Timestamp(janela[0]).value), float(pd.Timestamp(janela[1]).value)
+        else:
+            inicio, fim = float(janela[0]), float(janela[1])
+        mascara &= (valores_x >= inicio) & (valores_x <= fim)
+    posicoes = np.flatnonzero(mascara)
+
+    # Ordena por X (estável, para manter a ordem original entre valores iguais)
+    posicoes = posicoes[np.argsort(valores_x[posicoes], kind="stable")]
+
+    if grupo:
+        # Separa as posições por categoria sem perder a ordem por X dentro de cada uma
+        codigos = pd.factorize(df[grupo].iloc[posicoes], use_na_sentinel=False)[0]
+        ordem = np.argsort(codigos, kind="stable")
+        series = np.split(posicoes[ordem], np.cumsum(np.bincount(codigos))[:-1]) if len(codigos) else []
+    else:
+        series = [posicoes]
+
+    if not limite or not numerico:
+        return list(series)
+    limite = min(limite, max(orcamento_total // max(len(series), 1), 3))
+    return [serie[lttb(valores_x[serie], valores_y[serie], limite)] for serie in series]
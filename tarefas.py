@@ -0,0 +1,108 @@
+# tarefas.py
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+# Cargas executadas ao mesmo tempo no processo (as demais esperam na fila)
+TRABALHADORES = int(os.environ.get("GRAFICOS_TRABALHADORES", 2))
+
+_executor = ThreadPoolExecutor(max_workers=TRABALHADORES, thread_name_prefix="graficos-carga")
+
+# Tarefas em andamento (chave -> Tarefa): sessões que pedem a mesma carga acompanham a mesma tarefa
+_tarefas = {}
+_trava_tarefas = threading.Lock()
+
+
+class TarefaCancelada(Exception):
+    """Erro levantado dentro da tarefa quando ninguém mais espera pelo seu resultado."""
+
+
+class Tarefa:
+    """
+    Trabalho executado em segundo plano, com progresso, prévia e cancelamento cooperativo:
+    a função executada chama tarefa.progresso() periodicamente, que interrompe a execução se a tarefa
+    tiver sido cancelada.
+    """
+
+    def __init__(self, chave):
+        self.chave = chave
+        self.fracao = 0.0
+        self.mensagem = "Na fila"
+        self.previa = None  # DataFrame com as primeiras linhas, quando disponível
+        self.futuro = None
+        self._cancelada = threading.Event()
+        self._interessados = 1
+
+    def progresso(self, fracao, mensagem):
+        """
+        Atualiza o andamento; levanta TarefaCancelada se a tarefa não for mais necessária.
+        """
+        if self._cancelada.is_set():
+            raise TarefaCancelada(mensagem)
+        self.fracao, self.mensagem = min(max(fracao, 0.0), 1.0), mensagem
+
+    @property
+    def cancelada(self):
+        return self._cancelada.is_set()
+
+    @property
+    def concluida(self):
+        return self.futuro.done()
+
+    def aguardar(self, segundos):
+        """
+        Espera a tarefa terminar por até `segundos` e indica se terminou.
+        """
+        concluidas, _ = wait([self.futuro], timeout=segundos)
+        return bool(concluidas)
+
+    def resultado(self):
+        """
+        Retorna o resultado da tarefa concluída (ou levanta o erro que ela levantou).
+        """
+        return self.futuro.result()
+
+    def cancelar(self):
+        """
+        Desiste da tarefa. Ela só é interrompida quando nenhuma outra sessão está esperando por ela.
+        """
+        with _trava_tarefas:
+            self._interessados -= 1
+            if self._interessados > 0:
+                return
+            self._cancelada.set()
+            if _tarefas.get(self.chave) is self:
+                del _tarefas[self.chave]
+        self.futuro.cancel()  # Se ainda estiver na fila, nem começa
+
+
+def iniciar_tarefa(chave, funcao, *args, **kwargs):
+    """
+    Executa funcao(tarefa, *args, **kwargs) em segundo plano, ou acompanha a tarefa já em andamento
+    com a mesma chave.
+
+    Parâmetros:
+    - chave (hashable): Identifica o trabalho (ex.: impressão do arquivo e parâmetros da carga).
+    - funcao (callable): Recebe a Tarefa como primeiro argumento, para informar progresso e prévia.
+
+    Retorno:
+    - Tarefa: Tarefa em andamento (cancele-a com tarefa.cancelar() quando não precisar mais dela).
+    """
+    with _trava_tarefas:
+        tarefa = _tarefas.get(chave)
+        if tarefa is not None and not tarefa.cancelada:
+            tarefa._interessados += 1
+            return tarefa
+        tarefa = Tarefa(chave)
+        _tarefas[chave] = tarefa
+        tarefa.futuro = _executor.submit(_executar, tarefa, funcao, args, kwargs)
+    return tarefa
+
+
+def _executar(tarefa, funcao, args, kwargs):
+    try:
+        return funcao(tarefa, *args, **kwargs)
+    finally:
+        with _trava_tarefas:
+            if _tarefas.get(tarefa.chave) is tarefa:
+                del _tarefas[tarefa.chave]
@@ -0,0 +1,98 @@
+# transporte.py
+import base64
+import time
+
+import numpy as np
+import plotly.graph_objects as go
+import plotly.io as pio
+
+# Tipos de array aceitos pelo plotly.js (>= 2.28) no formato {"dtype", "bdata", "shape"}
+TIPOS_BINARIOS = {
+    np.dtype("float64"): "f8",
+    np.dtype("float32"): "f4",
+    np.dtype("int32"): "i4",
+    np.dtype("uint32"): "u4",
+    np.dtype("int16"): "i2",
+    np.dtype("uint16"): "u2",
+    np.dtype("int8"): "i1",
+    np.dtype("uint8"): "u1",
+}
+
+# Arrays menores que isso continuam em JSON comum (o ganho não compensa)
+TAMANHO_MINIMO = 64
+
+
+def _cabe_int32(valores):
+    return valores.min() >= np.iinfo("int32").min and valores.max() <= np.iinfo("int32").max
+
+
+def _codificar_array(valores):
+    """
+    Converte um array numérico do NumPy para o formato binário tipado do plotly.js (base64).
+    Valores que cabem sem perda em um tipo menor são reduzidos (int32 ou float32);
+    os demais tipos sem equivalente viram float64.
+    """
+    if valores.dtype.kind in "iu" and valores.dtype.itemsize == 8:
+        valores = valores.astype("int32" if _cabe_int32(valores) else "float64")
+    elif valores.dtype == np.float64:
+        # Números inteiros guardados como float (ex.: posições de linha no customdata) viajam como int32
+        if np.isfinite(valores).all() and (valores == np.trunc(valores)).all() and _cabe_int32(valores):
+            valores = valores.astype("int32")
+        elif (valores.astype("float32") == valores).all():
+            valores = valores.astype("float32")
+    if valores.dtype.newbyteorder("=") not in TIPOS_BINARIOS:
+        valores = valores.astype("float64")
+    valores = np.ascontiguousarray(valores, dtype=valores.dtype.newbyteorder("<"))
+    codificado = {"dtype": TIPOS_BINARIOS[valores.dtype], "bdata": base64.b64encode(valores.tobytes()).decode("ascii")}
+    if valores.ndim > 1:
+        codificado["shape"] = ", ".join(str(n) for n in valores.shape)
+    return codificado
+
+
+def codificar_binario(objeto):
+    """
+    Percorre o dicionário de uma figura e troca os arrays numéricos grandes pelo formato binário tipado.
+
+    Parâmetros:
+    - objeto (dict, list ou valor): Estrutura gerada por Figure.to_dict().
+
+    Retorno:
+    - Mesma estrutura, com os arrays numéricos codificados em base64.
+    """
+    if isinstance(objeto, dict):
+        return {chave: codificar_binario(valor) for chave, valor in objeto.items()}
+    if isinstance(objeto, (list, tuple)):
+        return [codificar_binario(valor) for valor in objeto]
+    if isinstance(objeto, np.ndarray) and objeto.size >= TAMANHO_MINIMO and objeto.dtype.kind in "iuf":
+        return _codificar_array(objeto)
+    return objeto
+
+
+class FiguraBinaria(go.Figure):
+    """Figura cujo to_dict() já entrega os arrays numéricos em formato binário tipado (usado pelo st.plotly_chart)."""
+
+    def to_dict(self):
+        return codificar_binario(super().to_dict())
+
+
+def relatorio_transporte(fig):
+    """
+    Compara o tamanho e o tempo de serialização da figura em JSON comum e em formato binário.
+
+    Parâmetros:
+    - fig (go.Figure): Figura a medir.
+
+    Retorno:
+    - dict: {'json_bytes', 'binario_bytes', 'json_ms', 'binario_ms'}.
+    """
+    inicio = time.perf_counter()
+    texto_json = pio.to_json(go.Figure.to_dict(fig), validate=False)
+    meio = time.perf_counter()
+    texto_binario = pio.to_json(codificar_binario(go.Figure.to_dict(fig)), validate=False)
+    fim = time.perf_counter()
+    return {
+        "json_bytes": len(texto_json),
+        "binario_bytes": len(texto_binario),
+        "json_ms": (meio - inicio) * 1000,
+        "binario_ms": (fim - meio) * 1000,
+    }